@@ -17,6 +17,9 @@ class SirenState:
     sr_used: int = 0
     last_cb_ts: float = 0.0   
     overflows: int = 0        
+    armed: bool = False
+    infer_calls: int = 0
+    infer_ms: float = 0.0
 
 
 def list_mics():
@@ -35,14 +38,19 @@ class MicWorker:
     - Very light callback using a ring buffer (no np.concatenate)
     - Inference errors won't kill audio
     - Restarts stream if callback stalls
+    - Siren model only runs while armed (see arm()), unless always_infer
     """
 
-    def __init__(self, device_id, infer, window_sec=3, sr=None, threshold=0.85, consecutive_needed=2):
+    def __init__(self, device_id, infer, window_sec=3, sr=None, threshold=0.85, consecutive_needed=2,
+                 always_infer=False):
         self.device_id = int(device_id)
         self.infer = infer
         self.window_sec = float(window_sec)
         self.threshold = float(threshold)
         self.consecutive_needed = int(consecutive_needed)
+        self.always_infer = bool(always_infer)
+        self.armed_until = 0.0
+        self._kick = False
 
         d = sd.query_devices(self.device_id)
         default_sr = int(d.get("default_samplerate", 48000))
@@ -61,6 +69,16 @@ class MicWorker:
     def stop(self):
         self._stop = True
 
+    def arm(self, sec):
+        """
+        Run the siren model for the next `sec` seconds (first window right away).
+        """
+        until = time.time() + float(sec)
+        if until > self.armed_until:
+            if time.time() >= self.armed_until:
+                self._kick = True
+            self.armed_until = until
+
     def _rms_db(self, audio: np.ndarray):
         rms = float(np.sqrt(np.mean(np.square(audio)) + 1e-12))
         db = 20.0 * math.log10(rms + 1e-12)
@@ -149,17 +167,37 @@ class MicWorker:
                         self.state.last_error = "Audio callback stalled. Restarting stream..."
                         break
 
-                    if (now - last_run) >= self.window_sec:
+                    armed = self.always_infer or now < self.armed_until
+                    self.state.armed = armed
+                    due = (now - last_run) >= self.window_sec
+
+                    if armed and (due or self._kick):
+                        self._kick = False
                         audio = self._read_latest_window()
-                    
-                        label, conf = "traffic", 0.0
-                        is_emergency = False
-                    
-                        self.state.consecutive_hits = 0
+
+                        t0 = time.perf_counter()
+                        try:
+                            label, conf = self.infer.predict(audio)
+                        except Exception as e:
+                            label, conf = "traffic", 0.0
+                            self.state.last_error = f"Infer error: {type(e).__name__}: {e}"
+                        self.state.infer_calls += 1
+                        self.state.infer_ms = (time.perf_counter() - t0) * 1e3
+
+                        is_emergency = label != "traffic" and float(conf) >= self.threshold
+                        self.state.consecutive_hits = self.state.consecutive_hits + 1 if is_emergency else 0
                         self.state.label = label
-                        self.state.conf = conf
+                        self.state.conf = float(conf)
+                        self.state.triggered = self.state.consecutive_hits >= self.consecutive_needed
+
+                        last_run = now
+
+                    elif due:
+                        self.state.consecutive_hits = 0
+                        self.state.label = "traffic"
+                        self.state.conf = 0.0
                         self.state.triggered = False
-                    
+
                         last_run = now
 
 
@@ -0,0 +1,211 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+
+def _raise_priority():
+    """
+    Best effort: real-time / time-critical priority for the calling thread.
+    Returns a short description of what was applied.
+    """
+    if hasattr(os, "sched_setscheduler"):
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(10))
+            return "SCHED_FIFO"
+        except (PermissionError, OSError):
+            pass
+    if sys.platform == "win32":
+        try:
+            import ctypes
+
+            k32 = ctypes.windll.kernel32
+            if k32.SetThreadPriority(k32.GetCurrentThread(), 15):  # THREAD_PRIORITY_TIME_CRITICAL
+                return "TIME_CRITICAL"
+        except Exception:
+            pass
+    return "normal"
+
+
+class ActuationLoop:
+    """
+    Dedicated output thread, decoupled from inference timing:
+    - with a `controller`, the thread owns the phase timing: it calls
+      controller.step() every `period` s, so YELLOW -> ALL_RED -> GREEN
+      fire at state_end even while inference is busy; the control loop
+      only hands over new inputs with feed(counts, emergency, degraded)
+    - without one, the control loop calls submit(signals, ph) itself
+      (never touches hardware)
+    - thread wakes every `period` s, writes only when the state changed
+    - writes must be confirmed by the driver, else retried, then failsafe
+    - a new GREEN is only written after all approaches were RED for at
+      least `min_all_red` s, whatever the controller asked for
+    - no submit for `stale_sec` -> all red (control loop hung / crashed)
+
+    Jitter = output write time - scheduled transition time (ph["state_start"],
+    i.e. the previous state_end for timed transitions).
+    """
+
+    def __init__(self, driver, n, period=0.01, min_all_red=1.0, stale_sec=2.0,
+                 max_retries=3, history=1000, controller=None, signals_fn=None):
+        self.driver = driver
+        self.n = int(n)
+        self.controller = controller
+        self.signals_fn = signals_fn
+        self.phase = None
+        self.period = float(period)
+        self.min_all_red = float(min_all_red)
+        self.stale_sec = float(stale_sec)
+        self.max_retries = int(max_retries)
+
+        self._lock = threading.Lock()
+        self._desired = ["RED"] * self.n
+        self._desired_start = None
+        self._submit_ts = 0.0
+
+        self.output = None
+        self._all_red_since = None
+        self._last_green = None
+        self._fails = 0
+
+        self.fault = False
+        self.failsafe_active = False
+        self.held_for_all_red = 0
+        self.writes = 0
+        self.write_failures = 0
+        self.overruns = 0
+        self.priority = "normal"
+        self.last_error = ""
+        self._jitter = deque(maxlen=int(history))
+
+        self._stop = False
+        self._thread = None
+
+    def start(self):
+        self.driver.open()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="actuation")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop = True
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        try:
+            self.driver.failsafe()
+        except Exception:
+            pass
+        self.driver.close()
+
+    def submit(self, signals, ph=None):
+        start = None if ph is None else ph.get("state_start")
+        with self._lock:
+            self._desired = list(signals)
+            self._desired_start = start
+            self._submit_ts = time.time()
+
+    def feed(self, counts, emergency_idxs=None, degraded_idxs=None):
+        """
+        Controller mode: new detector inputs. Returns the current phase dict.
+        """
+        with self._lock:
+            self.controller.update(counts, emergency_idxs, degraded_idxs)
+            self._submit_ts = time.time()
+        return self._step_controller()
+
+    def _step_controller(self):
+        with self._lock:
+            ph = self.controller.step()
+            self._desired = list(self.signals_fn(self.n, ph))
+            self._desired_start = ph.get("state_start")
+            self.phase = ph
+        return ph
+
+    def _target(self, now):
+        with self._lock:
+            desired = list(self._desired)
+            start = self._desired_start
+            submit_ts = self._submit_ts
+
+        if self.fault or (now - submit_ts) > self.stale_sec:
+            self.failsafe_active = True
+            return ["RED"] * self.n, None
+        self.failsafe_active = False
+
+        if "GREEN" in desired:
+            g = desired.index("GREEN")
+            if g != self._last_green:
+                if self.output is not None and any(s != "RED" for s in self.output):
+                    self.held_for_all_red += 1
+                    return ["RED"] * self.n, None
+                if self._all_red_since is None or (now - self._all_red_since) < self.min_all_red:
+                    self.held_for_all_red += 1
+                    return ["RED"] * self.n, None
+        return desired, start
+
+    def _write(self, target, start):
+        try:
+            ok = self.driver.write(target)
+        except Exception as e:
+            self.last_error = f"Driver error: {type(e).__name__}: {e}"
+            ok = False
+
+        if not ok:
+            self.write_failures += 1
+            self._fails += 1
+            if self._fails >= self.max_retries:
+                self.fault = True
+                self.last_error = self.last_error or "Write not confirmed. Failsafe."
+                try:
+                    self.driver.failsafe()
+                except Exception:
+                    pass
+            return
+
+        now = time.time()
+        self._fails = 0
+        self.writes += 1
+        self.output = list(target)
+
+        if all(s == "RED" for s in target):
+            if self._all_red_since is None:
+                self._all_red_since = now
+        else:
+            self._all_red_since = None
+        if "GREEN" in target:
+            self._last_green = target.index("GREEN")
+
+        if start is not None:
+            self._jitter.append(now - float(start))
+
+    def _run(self):
+        self.priority = _raise_priority()
+        next_t = time.perf_counter()
+
+        while not self._stop:
+            if self.controller is not None and self._submit_ts > 0.0:
+                self._step_controller()
+            target, start = self._target(time.time())
+            if target != self.output and not (self.fault and self.output is not None):
+                self._write(target, start)
+
+            next_t += self.period
+            delay = next_t - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self.overruns += 1
+                next_t = time.perf_counter()
+
+    def stats(self):
+        j = sorted(self._jitter)
+        if not j:
+            return {"n": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        return {
+            "n": len(j),
+            "mean_ms": sum(j) / len(j) * 1e3,
+            "p50_ms": j[len(j) // 2] * 1e3,
+            "p99_ms": j[min(len(j) - 1, int(0.99 * len(j)))] * 1e3,
+            "max_ms": j[-1] * 1e3,
+        }
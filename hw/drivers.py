@@ -0,0 +1,168 @@
+import time
+
+
+LAMPS = ("RED", "YELLOW", "GREEN")
+
+
+class SignalDriver:
+    """
+    Output driver interface used by ActuationLoop.
+    - write(signals) gets one "RED"/"YELLOW"/"GREEN" per approach and must
+      return True only once the hardware confirmed the new state
+    - failsafe() puts the cabinet into its safe state (all red)
+    """
+
+    name = "base"
+
+    def open(self):
+        pass
+
+    def write(self, signals) -> bool:
+        raise NotImplementedError
+
+    def failsafe(self):
+        self.write(["RED"] * self.n)
+
+    def close(self):
+        pass
+
+
+class MockDriver(SignalDriver):
+    """
+    Records every write. Optional fake latency / failures for testing.
+    """
+
+    name = "mock"
+
+    def __init__(self, n, latency=0.0, fail_every=0):
+        self.n = int(n)
+        self.latency = float(latency)
+        self.fail_every = int(fail_every)
+        self.writes = []
+        self.failsafes = 0
+        self._calls = 0
+
+    def write(self, signals) -> bool:
+        self._calls += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        if self.fail_every and self._calls % self.fail_every == 0:
+            return False
+        self.writes.append((time.time(), list(signals)))
+        return True
+
+    def failsafe(self):
+        self.failsafes += 1
+        self.writes.append((time.time(), ["RED"] * self.n))
+
+
+class SerialDriver(SignalDriver):
+    """
+    Line protocol for a PLC / microcontroller on a serial port:
+        host -> "S:RGRY\\n"   (one letter per approach)
+        dev  -> "OK:RGRY\\n"  (echo of the applied state)
+    """
+
+    name = "serial"
+
+    def __init__(self, n, port, baud=115200, ack_timeout=0.05):
+        self.n = int(n)
+        self.port = port
+        self.baud = int(baud)
+        self.ack_timeout = float(ack_timeout)
+        self._ser = None
+
+    def open(self):
+        import serial
+
+        self._ser = serial.Serial(self.port, self.baud, timeout=self.ack_timeout,
+                                  write_timeout=self.ack_timeout)
+        self._ser.reset_input_buffer()
+
+    def write(self, signals) -> bool:
+        if self._ser is None:
+            self.open()
+        code = "".join(s[0] for s in signals)
+        self._ser.write(f"S:{code}\n".encode("ascii"))
+        reply = self._ser.readline().decode("ascii", errors="ignore").strip()
+        return reply == f"OK:{code}"
+
+    def close(self):
+        if self._ser is not None:
+            try:
+                self._ser.close()
+            finally:
+                self._ser = None
+
+
+class GpioSerialDriver(SignalDriver):
+    """
+    Relay / GPIO expander board behind a serial link.
+    Each approach uses 3 consecutive pins (R, Y, G), packed into a bitmask:
+        host -> 0xA5, nbytes, mask..., xor
+        dev  -> 0x5A, nbytes, latch..., xor   (pin latch read back)
+    The write is confirmed only if the read back latch equals the mask.
+    """
+
+    name = "gpio_serial"
+
+    def __init__(self, n, port, baud=115200, ack_timeout=0.05, pin_base=0):
+        self.n = int(n)
+        self.port = port
+        self.baud = int(baud)
+        self.ack_timeout = float(ack_timeout)
+        self.pin_base = int(pin_base)
+        self._nbytes = (self.pin_base + 3 * self.n + 7) // 8
+        self._ser = None
+
+    @staticmethod
+    def _xor(data):
+        x = 0
+        for b in data:
+            x ^= b
+        return x
+
+    def _mask(self, signals):
+        mask = 0
+        for i, s in enumerate(signals):
+            mask |= 1 << (self.pin_base + 3 * i + LAMPS.index(s))
+        return mask.to_bytes(self._nbytes, "little")
+
+    def open(self):
+        import serial
+
+        self._ser = serial.Serial(self.port, self.baud, timeout=self.ack_timeout,
+                                  write_timeout=self.ack_timeout)
+        self._ser.reset_input_buffer()
+
+    def write(self, signals) -> bool:
+        if self._ser is None:
+            self.open()
+        mask = self._mask(signals)
+        frame = bytes([0xA5, self._nbytes]) + mask
+        self._ser.write(frame + bytes([self._xor(frame)]))
+
+        reply = self._ser.read(self._nbytes + 3)
+        if len(reply) != self._nbytes + 3 or reply[0] != 0x5A:
+            return False
+        if self._xor(reply[:-1]) != reply[-1]:
+            return False
+        return reply[2:-1] == mask
+
+    def close(self):
+        if self._ser is not None:
+            try:
+                self._ser.close()
+            finally:
+                self._ser = None
+
+
+def make_driver(kind, n, port=None, baud=115200):
+    kind = (kind or "").lower()
+    if kind == "mock":
+        return MockDriver(n)
+    if kind == "serial":
+        return SerialDriver(n, port, baud)
+    if kind == "gpio_serial":
+        return GpioSerialDriver(n, port, baud)
+    raise ValueError(f"Unknown actuation driver: {kind}")
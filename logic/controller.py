@@ -1,19 +1,28 @@
 import time
 
 
-class FlowHoldController:
+class SignalPolicy:
     """
-    Normal:
-    - base green 10s
-    - extend +10s up to 90s if vehicles
-    - if empty -> max 10s then rotate
-    - special 90s rule: if next empty, keep current green until next has >=1
+    Shared phase FSM for every signal policy:
+    GREEN -> YELLOW -> ALL_RED -> next GREEN, plus emergency preemption.
+
+    Subclasses decide:
+    - _green_step(now, counts): end / extend the current green
+    - _pick_next(now, counts): which approach gets the next green
+    - _green_budget(idx): initial green budget for approach idx
 
     Emergency:
     - If siren on approach i:
         ALL_YELLOW (EMERGENCY_YELLOW_SEC)
         -> ALL_RED (EMERGENCY_ALL_RED_SEC)
         -> GREEN on i until siren goes away (+ release delay)
+
+    Degraded approaches (camera down, see tick(degraded_idxs=...)) keep
+    their last known count instead of looking empty.
+
+    tick() = update() (new detector inputs) + step() (timed transitions).
+    step() only needs the clock, so an output thread can call it at its own
+    rate and fire YELLOW -> ALL_RED -> GREEN on time between inference loops.
     """
 
     def __init__(
@@ -22,31 +31,34 @@ class FlowHoldController:
         yellow=3,
         all_red=2,
         base_green=30,
-        extend_step=10,
         max_green=90,
         emergency_yellow_sec=2.0,
         emergency_all_red_sec=1.0,
         emergency_release_delay_sec=3.0,
+        clock=time.time,
     ):
         self.n = int(n)
+        self._clock = clock
 
         self.yellow = float(yellow)
         self.all_red = float(all_red)
         self.base_green = float(base_green)
-        self.extend_step = float(extend_step)
         self.max_green = float(max_green)
 
         self.em_yellow = float(emergency_yellow_sec)
         self.em_all_red = float(emergency_all_red_sec)
         self.em_release_delay = float(emergency_release_delay_sec)
 
+        now = self._now()
         self.state = "GREEN"    
         self.active = 0
         self.yellow_idx = None
-        self.state_end = time.time() + self.base_green
+        self.state_end = now + self.base_green
+        self.state_start = now
 
         self.green_budget = self.base_green
-        self.green_start = time.time()
+        self.green_start = now
+        self.red_since = [now] * self.n
 
         self.emergency_active = False
         self.emergency_target = None
@@ -54,16 +66,90 @@ class FlowHoldController:
 
         self._em_stage = None  
 
-    def _now(self): return time.time()
+        self.green_bias = [0.0] * self.n
+        self.coord = None
+
+        self.last_counts = [0] * self.n
+        self.degraded = []
+
+        self.counts = [0] * self.n
+        self.emergency_idxs = []
+
+    def _now(self): return self._clock()
     def _left(self): return max(0.0, self.state_end - self._now())
     def _next(self, i): return (i + 1) % self.n
 
-    def _set(self, state, dur):
+    def _set(self, state, dur, at=None):
+        """
+        at: scheduled time of a timed transition (the previous state_end).
+        Only reported as state_start (jitter reference); the state still
+        lasts `dur` from now, so a late step never shortens yellow / all red.
+        """
+        now = self._now()
+        if self.state == "GREEN" and state != "GREEN":
+            self.red_since[self.active] = now
         self.state = state
-        self.state_end = self._now() + float(dur)
+        self.state_start = now if at is None else min(float(at), now)
+        self.state_end = now + float(dur)
         if state == "GREEN":
-            self.green_start = self._now()
-            self.green_budget = self.base_green
+            self.green_start = now
+            self.green_budget = self._green_budget(self.active)
+
+    def _green_budget(self, idx):
+        return min(self.max_green, max(1.0, self.base_green + self.green_bias[idx]))
+
+    def _end_green(self):
+        self.yellow_idx = self.active
+        self._set("YELLOW", self.yellow)
+
+    def _green_step(self, now, counts):
+        raise NotImplementedError
+
+    def _pick_next(self, now, counts):
+        raise NotImplementedError
+
+    def next_candidate(self):
+        """
+        Approach most likely to get the next green (emergency target
+        first). Read only, for sampling / scheduling decisions.
+        """
+        if self.emergency_active:
+            return self.emergency_target
+        return self._pick_next(self._now(), self.counts)
+
+    def _hold_degraded(self, counts, degraded_idxs):
+        """
+        Degraded approach (camera down / stale) -> last known count, not 0.
+        """
+        degraded = {int(i) for i in (degraded_idxs or []) if 0 <= int(i) < self.n}
+        self.degraded = sorted(degraded)
+        counts = list(counts)
+        for i in range(self.n):
+            if i in degraded:
+                counts[i] = self.last_counts[i]
+            else:
+                self.last_counts[i] = counts[i]
+        return counts
+
+    def set_green_bias(self, bias):
+        """
+        Per approach seconds added to the green budget (e.g. green-wave splits).
+        Applied from the next GREEN on.
+        """
+        bias = list(bias)[:self.n]
+        self.green_bias = [float(b) for b in bias] + [0.0] * (self.n - len(bias))
+
+    def set_coordination(self, approach, cycle=0.0, phase=0.0, min_green=5.0):
+        """
+        Green wave: the green of `approach` should open when
+        clock() % cycle == phase (clocks synced across intersections).
+        The green before it is held or shortened (not below min_green).
+        approach=None turns it off. Only FlowHoldController applies it.
+        """
+        if approach is None or cycle <= 0:
+            self.coord = None
+        else:
+            self.coord = (int(approach), float(cycle), float(phase) % float(cycle), float(min_green))
 
     def _start_emergency(self, target_idx):
         now = self._now()
@@ -88,14 +174,26 @@ class FlowHoldController:
             self.yellow_idx = None
             self._set("ALL_RED", self.all_red)
 
-    def tick(self, counts, emergency_idxs=None):
-        if emergency_idxs is None:
-            emergency_idxs = []
-
-        now = self._now()
-
+    def update(self, counts, emergency_idxs=None, degraded_idxs=None):
+        """
+        New inputs from the detection loop; used by every step() until the next update().
+        """
         if len(counts) != self.n:
-            counts = (counts[:self.n] + [0] * self.n)[:self.n]
+            counts = (list(counts)[:self.n] + [0] * self.n)[:self.n]
+        self.counts = self._hold_degraded(counts, degraded_idxs)
+        self.emergency_idxs = list(emergency_idxs or [])
+
+    def tick(self, counts, emergency_idxs=None, degraded_idxs=None):
+        self.update(counts, emergency_idxs, degraded_idxs)
+        return self.step()
+
+    def step(self):
+        """
+        Advance the FSM to now with the last update() inputs.
+        """
+        now = self._now()
+        counts = self.counts
+        emergency_idxs = self.emergency_idxs
 
         if emergency_idxs:
             target = int(emergency_idxs[0])
@@ -112,12 +210,12 @@ class FlowHoldController:
             if now >= self.state_end:
                 if self._em_stage == "ALL_YELLOW":
                     self._em_stage = "ALL_RED"
-                    self._set("ALL_RED", self.em_all_red)
+                    self._set("ALL_RED", self.em_all_red, at=self.state_end)
 
                 elif self._em_stage == "ALL_RED":
                     self._em_stage = "GREEN"
                     self.active = self.emergency_target
-                    self._set("GREEN", 1.0)  
+                    self._set("GREEN", 1.0, at=self.state_end)
 
                 elif self._em_stage == "GREEN":
  
@@ -132,50 +230,267 @@ class FlowHoldController:
                 "green_idx": self.active if self.state == "GREEN" else None,
                 "yellow_idx": None,  
                 "remaining": self._left(),
+                "state_start": self.state_start,
                 "green_budget": self.green_budget,
                 "tag": "EMERGENCY",
                 "emergency_target": self.emergency_target,
+                "degraded": self.degraded,
             }
 
-        cur = self.active
-        nxt = self._next(cur)
-        cur_count = int(counts[cur])
-        nxt_count = int(counts[nxt])
-
         if self.state == "GREEN":
-            elapsed = now - self.green_start
-
-            if cur_count <= 0:
-                if elapsed >= self.base_green:
-                    self.yellow_idx = cur
-                    self._set("YELLOW", self.yellow)
-            else:
-                if elapsed >= self.green_budget:
-                    if self.green_budget < self.max_green:
-                        self.green_budget = min(self.max_green, self.green_budget + self.extend_step)
-                        self.state_end = self.green_start + self.green_budget
-                    else:
-                        if nxt_count <= 0:
-                            self.state_end = now + 1.0
-                        else:
-                            self.yellow_idx = cur
-                            self._set("YELLOW", self.yellow)
+            self._green_step(now, counts)
 
         if now >= self.state_end:
             if self.state == "YELLOW":
                 self.yellow_idx = None
-                self._set("ALL_RED", self.all_red)
+                self._set("ALL_RED", self.all_red, at=self.state_end)
 
             elif self.state == "ALL_RED":
-                self.active = self._next(self.active)
-                self._set("GREEN", self.base_green)
+                self.active = self._pick_next(now, counts)
+                self._set("GREEN", self.base_green, at=self.state_end)
 
         return {
             "state": self.state,
             "green_idx": self.active if self.state == "GREEN" else None,
             "yellow_idx": self.yellow_idx if self.state == "YELLOW" else None,
             "remaining": self._left(),
+            "state_start": self.state_start,
             "green_budget": self.green_budget,
             "tag": "NORMAL",
             "emergency_target": None,
+            "degraded": self.degraded,
         }
+
+
+class FlowHoldController(SignalPolicy):
+    """
+    Normal:
+    - base green 10s
+    - extend +10s up to 90s if vehicles
+    - if empty -> max 10s then rotate
+    - special 90s rule: if next empty, keep current green until next has >=1
+    - strictly circular rotation
+
+    Green wave:
+    - negative green_bias (plan split shorter than base green) is a ceiling:
+      the green is not extended past it, otherwise extend_step would undo it
+    - set_coordination(): the green before the coordinated approach ends so
+      that approach opens on its offset, whatever the counts say
+    """
+
+    def __init__(
+        self,
+        n,
+        yellow=3,
+        all_red=2,
+        base_green=30,
+        extend_step=10,
+        max_green=90,
+        emergency_yellow_sec=2.0,
+        emergency_all_red_sec=1.0,
+        emergency_release_delay_sec=3.0,
+        clock=time.time,
+    ):
+        self.extend_step = float(extend_step)
+        super().__init__(
+            n,
+            yellow=yellow,
+            all_red=all_red,
+            base_green=base_green,
+            max_green=max_green,
+            emergency_yellow_sec=emergency_yellow_sec,
+            emergency_all_red_sec=emergency_all_red_sec,
+            emergency_release_delay_sec=emergency_release_delay_sec,
+            clock=clock,
+        )
+
+    def _pick_next(self, now, counts):
+        return self._next(self.active)
+
+    def _coord_end(self):
+        """
+        End of the current green that opens the coordinated approach on its
+        offset, or None (not next in rotation / would pass max_green).
+        """
+        if self.coord is None:
+            return None
+        ap, cycle, phase, min_green = self.coord
+        if self._next(self.active) != ap:
+            return None
+        lead = self.yellow + self.all_red
+        t = self.green_start + min_green + lead   # earliest opening we can make
+        end = t + (phase - t) % cycle - lead
+        if end - self.green_start > self.max_green:
+            return None
+        return end
+
+    def _green_step(self, now, counts):
+        cur = self.active
+        nxt = self._next(cur)
+        cur_count = int(counts[cur])
+        nxt_count = int(counts[nxt])
+
+        elapsed = now - self.green_start
+
+        end = self._coord_end()
+        if end is not None:
+            if now >= end:
+                self._end_green()  # a late step costs offset, never yellow time
+            else:
+                self.state_end = end
+            return
+
+        cap = self.max_green
+        if self.green_bias[cur] < 0:
+            cap = min(cap, self._green_budget(cur))
+
+        if cur_count <= 0:
+            if elapsed >= min(self.base_green, self.green_budget):
+                self._end_green()
+        else:
+            if elapsed >= self.green_budget:
+                if self.green_budget < cap:
+                    self.green_budget = min(cap, self.green_budget + self.extend_step)
+                    self.state_end = self.green_start + self.green_budget
+                else:
+                    if nxt_count <= 0:
+                        self.state_end = now + 1.0
+                    else:
+                        self._end_green()
+
+
+class MaxPressureController(SignalPolicy):
+    """
+    Queue weighted (max-pressure) policy, O(n) per tick:
+    - counts smoothed with an EMA (alpha = weight of the new sample)
+    - green budget = min_green + smoothed count * count_to_seconds,
+      capped by max_green and by what cycle_cap leaves for the others
+    - green ends once the budget is used and another approach has more
+      pressure, when the approach runs empty, at the green cap, or as soon
+      as another approach with demand waited max_wait
+    - next green: longest waiter past max_wait, else highest pressure
+      (smoothed queue, boosted by waiting time); empty approaches are
+      skipped, ties go to the first one in phase order
+    - nobody else waiting -> rest in green
+    """
+
+    def __init__(
+        self,
+        n,
+        yellow=3,
+        all_red=2,
+        min_green=8,
+        max_green=60,
+        count_to_seconds=2.0,
+        alpha=0.6,
+        max_wait=90,
+        cycle_cap=120,
+        emergency_yellow_sec=2.0,
+        emergency_all_red_sec=1.0,
+        emergency_release_delay_sec=3.0,
+        clock=time.time,
+    ):
+        self.count_to_seconds = float(count_to_seconds)
+        self.alpha = float(alpha)
+        self.max_wait = float(max_wait)
+        self.cycle_cap = float(cycle_cap)
+        self.smooth = [0.0] * int(n)
+        super().__init__(
+            n,
+            yellow=yellow,
+            all_red=all_red,
+            base_green=min_green,
+            max_green=max_green,
+            emergency_yellow_sec=emergency_yellow_sec,
+            emergency_all_red_sec=emergency_all_red_sec,
+            emergency_release_delay_sec=emergency_release_delay_sec,
+            clock=clock,
+        )
+        others = (self.n - 1) * (self.base_green + self.yellow + self.all_red)
+        self.green_cap = max(self.base_green, min(self.max_green, self.cycle_cap - others))
+
+    def _green_budget(self, idx):
+        g = self.base_green + self.smooth[idx] * self.count_to_seconds + self.green_bias[idx]
+        return min(self.green_cap, max(self.base_green, g))
+
+    def _update(self, counts):
+        a = self.alpha
+        for i in range(self.n):
+            self.smooth[i] = a * float(counts[i]) + (1.0 - a) * self.smooth[i]
+
+    def _has_demand(self, i, counts):
+        return counts[i] > 0 or self.smooth[i] >= 0.5
+
+    def _pressure(self, i, now):
+        wait = now - self.red_since[i]
+        return self.smooth[i] * (1.0 + wait / self.max_wait)
+
+    def update(self, counts, emergency_idxs=None, degraded_idxs=None):
+        # smooth once per detector sample, not per step()
+        super().update(counts, emergency_idxs, degraded_idxs)
+        self._update(self.counts)
+
+    def _green_step(self, now, counts):
+        cur = self.active
+        elapsed = now - self.green_start
+        if elapsed < self.base_green:
+            return
+
+        others = False
+        starving = False
+        best_p = 0.0
+        for j in range(self.n):
+            if j == cur or not self._has_demand(j, counts):
+                continue
+            others = True
+            if now - self.red_since[j] >= self.max_wait:
+                starving = True
+            best_p = max(best_p, self._pressure(j, now))
+
+        if not others:
+            return
+
+        if starving or not self._has_demand(cur, counts) or elapsed >= self.green_cap:
+            self._end_green()
+            return
+
+        # budget only grows during a green (queue discharging must not cut it)
+        self.green_budget = max(self.green_budget, self._green_budget(cur))
+        if elapsed >= self.green_budget and best_p > self.smooth[cur]:
+            self._end_green()
+
+    def _pick_next(self, now, counts):
+        cur = self.active
+        best, best_p = None, -1.0
+        oldest, oldest_wait = None, -1.0
+
+        for k in range(1, self.n + 1):
+            j = (cur + k) % self.n
+            if not self._has_demand(j, counts):
+                continue
+            if j == cur and self.state == "GREEN":
+                continue  # asked mid-green (next_candidate): red_since[cur] is stale
+            wait = now - self.red_since[j]
+            if wait >= self.max_wait and wait > oldest_wait:
+                oldest, oldest_wait = j, wait
+            p = self._pressure(j, now)
+            if p > best_p:
+                best, best_p = j, p
+
+        if oldest is not None:
+            return oldest
+        if best is not None:
+            return best
+        return self._next(cur)
+
+
+def make_policy(name, n, **kw):
+    """
+    "flowhold" | "maxpressure"
+    """
+    name = (name or "flowhold").lower()
+    if name == "flowhold":
+        return FlowHoldController(n, **kw)
+    if name == "maxpressure":
+        return MaxPressureController(n, **kw)
+    raise ValueError(f"Unknown signal policy: {name}")
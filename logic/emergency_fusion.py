@@ -0,0 +1,198 @@
+EMERGENCY_LABELS = {"ambulance", "fire truck", "firetruck"}
+
+
+def vision_emergency_conf(label_conf, labels=EMERGENCY_LABELS):
+    """
+    label_conf: YOLOWorldDetector.last_label_conf -> max conf of an emergency label.
+    """
+    return max((c for label, c in label_conf.items() if label in labels), default=0.0)
+
+
+class EmergencyFusion:
+    """
+    Vision + audio emergency detection per approach.
+
+    - v: EMA of the best "ambulance" / "fire truck" confidence from the
+      normal detection pass (no extra model)
+    - audio gate: MicWorker loudness (db), also free
+    - suspicious = v >= vision_gate or db >= audio_gate_db
+      -> caller arms the siren model on that approach only
+    - a: siren model confidence (only meaningful while armed)
+
+    Trigger when any of:
+    - MicWorker triggered (consecutive siren hits, as before)
+    - one siren hit (a >= siren_threshold) confirmed by vision (v >= vision_gate)
+    - strong visual evidence alone (v >= vision_only; None = off)
+
+    Emergency approaches are returned by fused score 1 - (1-v)(1-a), highest
+    first, ready for tick(emergency_idxs=...).
+    """
+
+    def __init__(
+        self,
+        n,
+        vision_alpha=0.5,
+        vision_gate=0.30,
+        vision_only=None,
+        audio_gate_db=-30.0,
+        siren_threshold=0.85,
+        labels=EMERGENCY_LABELS,
+    ):
+        self.n = int(n)
+        self.vision_alpha = float(vision_alpha)
+        self.vision_gate = float(vision_gate)
+        self.vision_only = None if vision_only is None else float(vision_only)
+        self.audio_gate_db = float(audio_gate_db)
+        self.siren_threshold = float(siren_threshold)
+        self.labels = set(labels)
+
+        self.vision = [0.0] * self.n
+        self.audio = [0.0] * self.n
+        self.fused = [0.0] * self.n
+        self.suspicious = [False] * self.n
+
+    def update_vision(self, i, label_conf):
+        """
+        Call after each detection pass on approach i (skipped passes keep v).
+        """
+        c = vision_emergency_conf(label_conf, self.labels)
+        a = self.vision_alpha
+        self.vision[i] = a * c + (1.0 - a) * self.vision[i]
+
+    def step(self, mic_states):
+        """
+        mic_states: MicWorker.state per approach.
+        Returns (emergency_idxs, suspicious_idxs).
+        """
+        hits = []
+        for i in range(self.n):
+            st = mic_states[i]
+            v = self.vision[i]
+            a = float(st.conf) if st.armed else 0.0
+            self.audio[i] = a
+
+            self.suspicious[i] = v >= self.vision_gate or float(st.db) >= self.audio_gate_db
+            self.fused[i] = 1.0 - (1.0 - v) * (1.0 - a)
+
+            if (st.triggered
+                    or (a >= self.siren_threshold and v >= self.vision_gate)
+                    or (self.vision_only is not None and v >= self.vision_only)):
+                hits.append(i)
+
+        hits.sort(key=lambda i: -self.fused[i])
+        return hits, [i for i in range(self.n) if self.suspicious[i]]
+
+
+# -----------------------------
+# Benchmark (simulated): python -m logic.emergency_fusion
+# -----------------------------
+class _SimMic:
+    """
+    Same arming / windowing / consecutive-hit rules as MicWorker.
+    """
+
+    def __init__(self, window, consecutive, threshold, always):
+        self.window = window
+        self.consecutive = consecutive
+        self.threshold = threshold
+        self.always = always
+        self.armed_until = -1.0
+        self.kick = False
+        self.last_run = -1e9
+        self.armed = False
+        self.conf = 0.0
+        self.db = -60.0
+        self.hits = 0
+        self.triggered = False
+        self.calls = 0
+
+    def arm(self, now, sec):
+        if now >= self.armed_until:
+            self.kick = True
+        self.armed_until = max(self.armed_until, now + sec)
+
+    def step(self, now, siren_conf):
+        self.armed = self.always or now < self.armed_until
+        due = now - self.last_run >= self.window
+        if self.armed and (due or self.kick):
+            self.kick = False
+            self.calls += 1
+            self.conf = siren_conf()
+            self.hits = self.hits + 1 if self.conf >= self.threshold else 0
+            self.triggered = self.hits >= self.consecutive
+            self.last_run = now
+        elif due:
+            self.conf, self.hits, self.triggered = 0.0, 0, False
+            self.last_run = now
+
+
+def _bench(n=4, duration=1800.0, dt=0.2, events=20, seed=3, model_ms=40.0):
+    import random
+
+    def run(mode):
+        rnd = random.Random(seed)
+        ev = []
+        for k in range(events):
+            t0 = (k + 0.5) * duration / events + rnd.uniform(-10, 10)
+            ev.append((t0, t0 + 20.0, rnd.randrange(n)))
+
+        fusion = EmergencyFusion(n)
+        mics = [_SimMic(3.0, 2, 0.85, always=(mode == "audio-only")) for _ in range(n)]
+        first = {}
+        false_trig = 0
+        t = 0.0
+
+        while t < duration:
+            active = [None] * n
+            recent = [False] * n   # event on / just left (trailing latch is not a false alarm)
+            for k, (a, b, i) in enumerate(ev):
+                if a <= t < b:
+                    active[i] = k
+                if a <= t < b + 10.0:
+                    recent[i] = True
+
+            for i in range(n):
+                on = active[i] is not None
+                # vision: emergency label seen in 70% of passes, rare low-conf false positives
+                if on and rnd.random() < 0.7:
+                    lc = {"ambulance": min(1.0, max(0.0, rnd.gauss(0.55, 0.15)))}
+                elif rnd.random() < 0.02:
+                    lc = {"ambulance": rnd.uniform(0.1, 0.3)}
+                else:
+                    lc = {}
+                fusion.update_vision(i, lc)
+
+                m = mics[i]
+                m.db = rnd.gauss(-20.0 if on else -45.0, 4.0)
+                m.step(t, lambda: rnd.uniform(0.86, 0.99) if (on and rnd.random() < 0.8) else rnd.uniform(0.0, 0.3))
+
+            if mode == "audio-only":
+                trig = [i for i in range(n) if mics[i].triggered]
+            else:
+                trig, susp = fusion.step(mics)
+                for i in susp:
+                    mics[i].arm(t, 6.0)
+
+            for i in trig:
+                k = active[i]
+                if not recent[i]:
+                    false_trig += 1
+                elif k is not None and k not in first:
+                    first[k] = t - ev[k][0]
+            t += dt
+
+        lat = sorted(first.values())
+        calls = [m.calls for m in mics]
+        per_min = sum(calls) / n / (duration / 60.0)
+        mean = sum(lat) / len(lat) if lat else float("nan")
+        print(f"{mode:<11} preempted={len(lat)}/{events} latency mean={mean:.2f}s "
+              f"max={(lat[-1] if lat else float('nan')):.2f}s false_trigger_ticks={false_trig} | "
+              f"siren model calls/approach/min={per_min:.2f} (~{per_min * model_ms / 60.0:.1f} ms/s per approach)")
+
+    print("simulated timeline (synthetic vision / audio scores, not recorded data)")
+    run("audio-only")
+    run("fusion")
+
+
+if __name__ == "__main__":
+    _bench()
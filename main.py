@@ -7,10 +7,18 @@ from tkinter import ttk, messagebox
 import sounddevice as sd
 
 import config as C
-from vision.yolo_world_detector import YOLOWorldDetector
+from vision.yolo_world_detector import YOLOWorldDetector, TileGate
 from audio.siren_infer import SirenInfer
 from audio.mic_worker import MicWorker, list_mics
-from logic.controller import FlowHoldController
+from logic.controller import make_policy
+from logic.emergency_fusion import EmergencyFusion
+from logic.greenwave import GreenWaveEngine, build_corridor
+from net.bus import make_transport, TelemetryPublisher, NeighbourSubscriber
+from hw.drivers import make_driver
+from hw.actuator import ActuationLoop
+from vision.load_governor import LoadGovernor, scale_roi
+from vision.stream_source import open_source, DeviceSource
+from vision.camera_health import CameraHealth, CameraWatchdog
 
 EMERGENCY_LATCH_SEC = C.EMERGENCY_LATCH_SEC
 
@@ -86,22 +94,40 @@ def draw_sound_meter(frame, db, x=20, y=220, w=260, h=16):
                 cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 2)
 
 
-def setup_cap(cam_index: int):
-    cap = cv2.VideoCapture(cam_index)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, C.FRAME_WIDTH)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, C.FRAME_HEIGHT)
-    return cap
+def setup_cap(cam_index):
+    """
+    int -> local OpenCV device, str -> RTSP/HTTP URL or video file.
+    """
+    if isinstance(cam_index, str):
+        return open_source(
+            cam_index,
+            backend=C.STREAM_BACKEND,
+            width=C.FRAME_WIDTH,
+            height=C.FRAME_HEIGHT,
+            fps=C.STREAM_FPS,
+            stale_sec=C.STREAM_STALE_SEC,
+            loop=C.STREAM_LOOP_FILES,
+            timeout=C.STREAM_TIMEOUT_SEC,
+        )
+
+    return DeviceSource(
+        cam_index,
+        width=C.FRAME_WIDTH,
+        height=C.FRAME_HEIGHT,
+        fps=C.CAMERA_FPS,
+        stale_sec=C.STREAM_STALE_SEC,
+    )
 
 
 # -----------------------------
 # Popup UI
 # -----------------------------
 def setup_popup(default_n=2):
-    cams = probe_cameras(8)
+    cams = probe_cameras(8) + list(C.STREAM_URLS)
     mics = list_input_mics()
 
     if not cams:
-        raise RuntimeError("No cameras found. Check camera indexes / drivers.")
+        raise RuntimeError("No cameras found. Check camera indexes / drivers / STREAM_URLS.")
     if not mics:
         raise RuntimeError("No input microphones found.")
 
@@ -158,8 +184,8 @@ def setup_popup(default_n=2):
             ent = tk.Entry(table, textvariable=name_var, width=18)
             ent.grid(row=i+1, column=1, padx=8)
 
-            cam_var = tk.IntVar(value=cam_values[i] if i < len(cam_values) else cam_values[0])
-            cam_box = ttk.Combobox(table, textvariable=cam_var, values=cam_values, state="readonly", width=12)
+            cam_var = tk.StringVar(value=str(cam_values[i] if i < len(cam_values) else cam_values[0]))
+            cam_box = ttk.Combobox(table, textvariable=cam_var, values=cam_values, state="readonly", width=24)
             cam_box.grid(row=i+1, column=2, padx=8)
 
             mic_var = tk.StringVar(value=mic_values[i] if i < len(mic_values) else mic_values[0])
@@ -192,7 +218,8 @@ def setup_popup(default_n=2):
     
             name = row["name_var"].get().strip() or f"CAM{i+1}"
     
-            cam_index = int(row["cam_var"].get())
+            cam_str = row["cam_var"].get().strip()
+            cam_index = int(cam_str) if cam_str.isdigit() else cam_str
             if cam_index in used_cams:
                 messagebox.showerror(
                     "Setup Error",
@@ -251,7 +278,8 @@ def main():
     approaches = setup_popup(default_n=2)
     n = len(approaches)
 
-    det = YOLOWorldDetector(C.YOLO_WORLD_WEIGHTS, C.PROMPTS, C.CONF, C.IOU)
+    det = YOLOWorldDetector(C.YOLO_WORLD_WEIGHTS, C.PROMPTS, C.CONF, C.IOU,
+                            tile=C.TILE_SIZE, tile_overlap=C.TILE_OVERLAP)
     siren = SirenInfer(C.SIREN_MODEL_PATH, sr=C.AUDIO_SR)
 
     caps = []
@@ -265,50 +293,174 @@ def main():
             window_sec=C.AUDIO_WINDOW_SEC,
             sr=C.AUDIO_SR,
             threshold=C.SIREN_CONF_THRESHOLD,
-            consecutive_needed=C.SIREN_CONSECUTIVE_HITS
+            consecutive_needed=C.SIREN_CONSECUTIVE_HITS,
+            always_infer=not C.FUSION_ENABLED,
         )
         mic_workers.append(mw)
         threading.Thread(target=mw.run_loop, daemon=True).start()
 
-    ctrl = FlowHoldController(
-        n=n,
-        yellow=3,
-        all_red=2,
-        base_green=10,
-        extend_step=10,
-        max_green=90,
+    watchdog = CameraWatchdog([
+        CameraHealth(ap["name"], cap, stale_sec=C.STREAM_STALE_SEC,
+                     dead_sec=C.CAMERA_DEAD_SEC, down_sec=C.CAMERA_DOWN_SEC)
+        for ap, cap in zip(approaches, caps)
+    ])
+
+    policy_kw = {
+        "flowhold": dict(
+            yellow=3,
+            all_red=2,
+            base_green=10,
+            extend_step=10,
+            max_green=90,
+        ),
+        "maxpressure": dict(
+            yellow=C.YELLOW,
+            all_red=C.ALL_RED,
+            min_green=C.MIN_GREEN,
+            max_green=C.MAX_GREEN,
+            count_to_seconds=C.COUNT_TO_SECONDS,
+            alpha=C.SMOOTHING_ALPHA,
+            max_wait=C.MAX_WAIT,
+            cycle_cap=C.CYCLE_CAP,
+        ),
+    }
+    # unknown C.POLICY -> ValueError from make_policy
+    ctrl = make_policy(
+        C.POLICY,
+        n,
         emergency_all_red_sec=C.EMERGENCY_ALL_RED_SEC,
         emergency_release_delay_sec=C.EMERGENCY_RELEASE_DELAY_SEC,
+        **policy_kw.get(str(C.POLICY).lower(), {}),
     )
 
 
+    bus = pub = neigh = None
+    if C.BUS_ENABLED:
+        bus = make_transport(C.BUS_URL)
+        pub = TelemetryPublisher(bus, C.INTERSECTION_ID, flush_interval=C.BUS_FLUSH_SEC)
+        neigh = NeighbourSubscriber(bus, own_id=C.INTERSECTION_ID,
+                                    neighbours=C.BUS_NEIGHBOURS, stale_sec=C.BUS_STALE_SEC)
+
+    wave = None
+    if C.GREENWAVE_ENABLED and neigh is not None:
+        wave = GreenWaveEngine(
+            build_corridor({**C.GREENWAVE_NODES, C.INTERSECTION_ID: n}, C.GREENWAVE_LINKS),
+            min_green=C.MIN_GREEN,
+            lost_time=C.YELLOW + C.ALL_RED,
+            count_to_seconds=C.COUNT_TO_SECONDS,
+            cycle_cap=C.CYCLE_CAP,
+        )
+
+    act = None
+    if C.ACTUATION_DRIVER:
+        act = ActuationLoop(
+            make_driver(C.ACTUATION_DRIVER, n, port=C.ACTUATION_PORT, baud=C.ACTUATION_BAUD),
+            n,
+            period=C.ACTUATION_PERIOD_SEC,
+            min_all_red=C.ACTUATION_MIN_ALL_RED_SEC,
+            stale_sec=C.ACTUATION_STALE_SEC,
+            controller=ctrl,
+            signals_fn=compute_signals,
+        ).start()
+
+    gov = None
+    if C.GOVERNOR_ENABLED:
+        gov = LoadGovernor(n, target_ms=C.GOVERNOR_TARGET_MS, log_path=C.GOVERNOR_LOG_PATH)
+
+    fusion = None
+    if C.FUSION_ENABLED:
+        fusion = EmergencyFusion(
+            n,
+            vision_gate=C.FUSION_VISION_GATE,
+            vision_only=C.FUSION_VISION_ONLY,
+            audio_gate_db=C.FUSION_AUDIO_GATE_DB,
+            siren_threshold=C.SIREN_CONF_THRESHOLD,
+        )
+
     em_latch_until = [0.0] * n
     last_print = 0.0
+    last_wave = 0.0
+    counts = [0] * n
+    rois = [ap["roi"] for ap in approaches]
+    tile_gates = [TileGate(C.TILE_ON_COUNT, C.TILE_OFF_COUNT) for _ in range(n)]
+    loop_allocs = loops = 0
 
     while True:
+        t_loop = time.perf_counter()
         frames = [None] * n
-        counts = [0] * n
+        degraded = watchdog.degraded()
+
+        if gov is not None:
+            sizes = gov.plan([ctrl.active, ctrl.next_candidate()])
+        else:
+            sizes = [640] * n
 
         for i in range(n):
+            if i in degraded:
+                # reconnecting in the background; controller holds last demand
+                continue
+
+            if sizes[i] is None:
+                # shed: keep last count; the reader thread already replaces
+                # (and recycles) unread frames, nothing to drop here
+                continue
+
             ok, frame = caps[i].read()
             if not ok or frame is None:
                 continue
 
-            out_frame, count, labels = det.detect_and_plot(frame, approaches[i]["roi"])
+            rois[i] = scale_roi(approaches[i]["roi"], frame.shape, C.FRAME_WIDTH, C.FRAME_HEIGHT)
+            tiled = (C.TILE_ENABLED and tile_gates[i].active
+                     and (gov is None or gov.rung <= C.TILE_MAX_RUNG))
+            out_frame, count, labels = det.detect_and_plot(frame, rois[i], imgsz=sizes[i],
+                                                           tiled=tiled, inplace=True)
             frames[i] = out_frame
             counts[i] = int(count)
+            if fusion is not None:
+                fusion.update_vision(i, det.last_label_conf)
+            if C.TILE_ENABLED:
+                tile_gates[i].update(counts[i])
 
         now = time.time()
-        for i, mw in enumerate(mic_workers):
-            if mw.state.triggered:
-                em_latch_until[i] = max(em_latch_until[i], now + EMERGENCY_LATCH_SEC)
+        if fusion is not None:
+            fused_idxs, suspicious = fusion.step([mw.state for mw in mic_workers])
+            for i in suspicious:
+                mic_workers[i].arm(C.FUSION_ARM_SEC)
+        else:
+            fused_idxs = [i for i, mw in enumerate(mic_workers) if mw.state.triggered]
 
-        emergency_idxs = [i for i in range(n) if now < em_latch_until[i]]
+        for i in fused_idxs:
+            em_latch_until[i] = max(em_latch_until[i], now + EMERGENCY_LATCH_SEC)
 
-        ph = ctrl.tick(counts, emergency_idxs)
+        emergency_idxs = [i for i in range(n) if now < em_latch_until[i]]
+        if fusion is not None:
+            emergency_idxs.sort(key=lambda i: -fusion.fused[i])
+        if ctrl.emergency_target in emergency_idxs:
+            # a new emergency_idxs[0] restarts preemption: keep the running
+            # target first while it is latched, score only orders the rest
+            emergency_idxs.remove(ctrl.emergency_target)
+            emergency_idxs.insert(0, ctrl.emergency_target)
+
+        if wave is not None and now - last_wave >= C.GREENWAVE_PERIOD_SEC:
+            wave.update_from_bus(neigh.phases())
+            wave.update_counts(C.INTERSECTION_ID, counts)
+            wave.solve()
+            ctrl.set_green_bias(wave.green_bias(C.INTERSECTION_ID, ctrl.base_green))
+            ap, cycle, phase = wave.coordination(C.INTERSECTION_ID) or (None, 0.0, 0.0)
+            ctrl.set_coordination(ap, cycle, phase, min_green=C.GREENWAVE_MIN_GREEN)
+            last_wave = now
+
+        if act is not None:
+            # output thread steps the controller between loops
+            ph = act.feed(counts, emergency_idxs, degraded_idxs=degraded)
+        else:
+            ph = ctrl.tick(counts, emergency_idxs, degraded_idxs=degraded)
 
         signals = compute_signals(n, ph)
 
+        if pub is not None:
+            pub.publish_tick(counts, ph)
+
         if now - last_print > 1.0:
             mic_status = " | ".join(
                 f"{approaches[i]['name']}:{mic_workers[i].state.label}:{mic_workers[i].state.conf:.2f}"
@@ -320,6 +472,36 @@ def main():
                 f"CTRL={ph.get('state')} green_idx={ph.get('green_idx')} yellow_idx={ph.get('yellow_idx')} "
                 f"left={ph.get('remaining',0):.1f}s tag={ph.get('tag','NORMAL')}"
             )
+            if fusion is not None:
+                print("  fusion: " + " | ".join(
+                    f"{approaches[i]['name']}:v={fusion.vision[i]:.2f},a={fusion.audio[i]:.2f},"
+                    f"armed={mic_workers[i].state.armed},siren_calls={mic_workers[i].state.infer_calls}"
+                    for i in range(n)
+                ))
+            if loops:
+                print(f"  frame buffers: {loop_allocs / loops:.2f} allocs/iter over {loops} iters "
+                      f"(pooled={[cap.pool.allocs for cap in caps]})")
+                loop_allocs = loops = 0
+            if degraded:
+                print(f"  cameras: {watchdog.states()} (holding last counts for {degraded})")
+            if C.TILE_ENABLED:
+                print(f"  tiled: {[g.active for g in tile_gates]}")
+            if gov is not None:
+                print(f"  governor: {gov.describe()} imgsz={gov.last_imgsz} skipped={gov.skipped}")
+            if act is not None:
+                js = act.stats()
+                print(f"  output: {act.output} prio={act.priority} writes={act.writes} "
+                      f"fail={act.write_failures} fault={act.fault} failsafe={act.failsafe_active} "
+                      f"jitter p50={js['p50_ms']:.1f}ms p99={js['p99_ms']:.1f}ms max={js['max_ms']:.1f}ms")
+            if neigh is not None:
+                nb = neigh.phases()
+                print("  neighbours: " + (" | ".join(
+                    f"{iid}:{m.state}:g={m.green_idx}:left={m.remaining:.1f}s" for iid, m in sorted(nb.items())
+                ) or "none"))
+            if wave is not None:
+                p = wave.plan(C.INTERSECTION_ID)
+                print(f"  greenwave: cycle={p.cycle:.0f}s offset={p.offset:.1f}s "
+                      f"splits={[round(g, 1) for g in p.splits]} coord={ctrl.coord}")
             last_print = now
 
         if C.SHOW_WINDOWS:
@@ -328,7 +510,7 @@ def main():
                 if frame is None:
                     continue
 
-                x1, y1, x2, y2 = approaches[i]["roi"]
+                x1, y1, x2, y2 = rois[i]
                 cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 255), 2)
 
                 draw_signal_light(frame, signals[i])
@@ -351,12 +533,35 @@ def main():
 
                 cv2.imshow(f"Approach {i+1} - {approaches[i]['name']}", frame)
 
+        # pooled capture buffers (annotated in place) go back to their source
+        for i in range(n):
+            if frames[i] is not None:
+                caps[i].release_frame(frames[i])
+
+        loop_allocs += sum(cap.pool.take_allocs() for cap in caps)
+        loops += 1
+
         key = cv2.waitKey(1)
         if key == 27:
             break
 
+        if gov is not None:
+            old_cap = gov.capture_size
+            if gov.observe((time.perf_counter() - t_loop) * 1e3) and gov.capture_size != old_cap:
+                w, h = gov.capture_size
+                for cap in caps:
+                    cap.set(cv2.CAP_PROP_FRAME_WIDTH, w)
+                    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
+
     for mw in mic_workers:
         mw.stop()
+    watchdog.stop()
+    if act is not None:
+        act.stop()
+    if pub is not None:
+        pub.stop()
+    if bus is not None:
+        bus.close()
     for cap in caps:
         cap.release()
     cv2.destroyAllWindows()
@@ -0,0 +1,363 @@
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+
+
+TOPIC_ROOT = "signalx"
+
+_MAGIC = b"SX"
+_VERSION = 1
+
+# magic, version, ts, state, green_idx, yellow_idx, emergency_target, tag,
+# remaining, green_budget, n_counts  (+ n_counts * uint16)
+_HEADER = struct.Struct("<2sBdBbbbBffB")
+_COUNT = struct.Struct("<H")
+
+STATES = ["GREEN", "YELLOW", "ALL_RED", "ALL_YELLOW"]
+TAGS = ["NORMAL", "EMERGENCY"]
+
+
+def phase_topic(intersection_id: str) -> str:
+    return f"{TOPIC_ROOT}/{intersection_id}/phase"
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """
+    MQTT style match: '+' = one level, '#' = rest of topic.
+    """
+    p = pattern.split("/")
+    t = topic.split("/")
+    for i, part in enumerate(p):
+        if part == "#":
+            return True
+        if i >= len(t):
+            return False
+        if part != "+" and part != t[i]:
+            return False
+    return len(p) == len(t)
+
+
+@dataclass
+class PhaseMsg:
+    ts: float = 0.0
+    state: str = "GREEN"
+    green_idx: int | None = None
+    yellow_idx: int | None = None
+    emergency_target: int | None = None
+    tag: str = "NORMAL"
+    remaining: float = 0.0
+    green_budget: float = 0.0
+    counts: list = field(default_factory=list)
+
+
+def _idx(v):
+    return -1 if v is None else int(v)
+
+
+def _unidx(v):
+    return None if v < 0 else v
+
+
+def encode_phase(counts, ph, ts=None) -> bytes:
+    """
+    Packs one controller tick (FlowHoldController.tick output + counts)
+    into a fixed little-endian record (~30 bytes for 4 approaches).
+    """
+    counts = list(counts)[:255]
+    state = ph.get("state", "GREEN")
+    tag = ph.get("tag", "NORMAL")
+    head = _HEADER.pack(
+        _MAGIC,
+        _VERSION,
+        time.time() if ts is None else float(ts),
+        STATES.index(state) if state in STATES else 0,
+        _idx(ph.get("green_idx")),
+        _idx(ph.get("yellow_idx")),
+        _idx(ph.get("emergency_target")),
+        TAGS.index(tag) if tag in TAGS else 0,
+        float(ph.get("remaining", 0.0)),
+        float(ph.get("green_budget", 0.0)),
+        len(counts),
+    )
+    body = b"".join(_COUNT.pack(max(0, min(0xFFFF, int(c)))) for c in counts)
+    return head + body
+
+
+def decode_phase(payload: bytes) -> PhaseMsg:
+    (magic, version, ts, state, g, y, em, tag,
+     remaining, budget, n) = _HEADER.unpack_from(payload, 0)
+
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError(f"Bad phase message (magic={magic!r}, version={version})")
+
+    off = _HEADER.size
+    counts = list(struct.unpack_from(f"<{n}H", payload, off)) if n else []
+
+    return PhaseMsg(
+        ts=ts,
+        state=STATES[state] if state < len(STATES) else "GREEN",
+        green_idx=_unidx(g),
+        yellow_idx=_unidx(y),
+        emergency_target=_unidx(em),
+        tag=TAGS[tag] if tag < len(TAGS) else "NORMAL",
+        remaining=remaining,
+        green_budget=budget,
+        counts=counts,
+    )
+
+
+# -----------------------------
+# Transports
+# -----------------------------
+class LocalBroker:
+    """
+    In-process stand-in for an MQTT broker.
+    - send_batch() delivers synchronously to every matching subscriber
+    - used for tests / benchmarks / single box demos
+    """
+
+    def __init__(self):
+        self._subs = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, pattern, callback):
+        with self._lock:
+            self._subs.append((pattern, callback))
+
+    def send_batch(self, items):
+        with self._lock:
+            subs = list(self._subs)
+        for topic, payload in items:
+            for pattern, cb in subs:
+                if topic_matches(pattern, topic):
+                    cb(topic, payload)
+
+    def close(self):
+        with self._lock:
+            self._subs.clear()
+
+
+class MqttTransport:
+    """
+    Thin wrapper around paho-mqtt (QoS 0, no retain).
+    paho runs its own network thread, so publish() never blocks on the socket.
+    """
+
+    def __init__(self, host="localhost", port=1883, client_id="", keepalive=30):
+        import paho.mqtt.client as mqtt
+
+        if hasattr(mqtt, "CallbackAPIVersion"):
+            self._client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id)
+        else:
+            self._client = mqtt.Client(client_id=client_id)
+
+        self._subs = []
+        self._client.on_message = self._on_message
+        self._client.on_connect = self._on_connect
+        self._client.connect_async(host, int(port), keepalive)
+        self._client.loop_start()
+
+    def _on_connect(self, client, userdata, *args):
+        for pattern, _ in self._subs:
+            client.subscribe(pattern, qos=0)
+
+    def _on_message(self, client, userdata, msg):
+        for pattern, cb in self._subs:
+            if topic_matches(pattern, msg.topic):
+                cb(msg.topic, msg.payload)
+
+    def subscribe(self, pattern, callback):
+        self._subs.append((pattern, callback))
+        self._client.subscribe(pattern, qos=0)
+
+    def send_batch(self, items):
+        for topic, payload in items:
+            self._client.publish(topic, payload, qos=0, retain=False)
+
+    def close(self):
+        self._client.loop_stop()
+        self._client.disconnect()
+
+
+def make_transport(url: str):
+    """
+    "local"              -> LocalBroker
+    "mqtt://host[:port]" -> MqttTransport
+    """
+    if url in ("", "local"):
+        return LocalBroker()
+    if url.startswith("mqtt://"):
+        host, _, port = url[len("mqtt://"):].partition(":")
+        return MqttTransport(host or "localhost", int(port or 1883))
+    raise ValueError(f"Unknown bus url: {url}")
+
+
+# -----------------------------
+# Publisher / Subscriber
+# -----------------------------
+class TelemetryPublisher:
+    """
+    Non-blocking publisher:
+    - publish() only stores the payload under its topic (latest wins)
+    - a sender thread wakes up, swaps out everything pending and sends it
+      as one batch, at most every flush_interval seconds
+    - the control loop never waits on the network
+    """
+
+    def __init__(self, transport, intersection_id: str, flush_interval=0.05):
+        self.transport = transport
+        self.intersection_id = str(intersection_id)
+        self.flush_interval = float(flush_interval)
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+
+        self.sent = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.last_error = ""
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def publish(self, topic, payload: bytes):
+        with self._lock:
+            if topic in self._pending:
+                self.coalesced += 1
+            self._pending[topic] = payload
+        self._wake.set()
+
+    def publish_tick(self, counts, ph):
+        self.publish(phase_topic(self.intersection_id), encode_phase(counts, ph))
+
+    def flush(self):
+        with self._lock:
+            items = list(self._pending.items())
+            self._pending.clear()
+        if not items:
+            return 0
+        try:
+            self.transport.send_batch(items)
+            self.sent += len(items)
+            self.batches += 1
+        except Exception as e:
+            self.last_error = f"Send error: {type(e).__name__}: {e}"
+        return len(items)
+
+    def _run(self):
+        while not self._stop:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop:
+                break
+            t0 = time.time()
+            self.flush()
+            dt = time.time() - t0
+            if dt < self.flush_interval:
+                time.sleep(self.flush_interval - dt)
+
+    def stop(self):
+        self._stop = True
+        self._wake.set()
+        self._thread.join(timeout=1.0)
+        self.flush()
+
+
+class NeighbourSubscriber:
+    """
+    Keeps the latest PhaseMsg per neighbour intersection.
+    neighbours=None -> accept every intersection except our own.
+    """
+
+    def __init__(self, transport, own_id=None, neighbours=None, stale_sec=3.0):
+        self.own_id = None if own_id is None else str(own_id)
+        self.neighbours = None if neighbours is None else set(map(str, neighbours))
+        self.stale_sec = float(stale_sec)
+
+        self._latest = {}
+        self._recv_ts = {}
+        self._lock = threading.Lock()
+        self.on_update = None
+
+        self.received = 0
+        self.errors = 0
+
+        transport.subscribe(f"{TOPIC_ROOT}/+/phase", self._on_message)
+
+    def _on_message(self, topic, payload):
+        parts = topic.split("/")
+        if len(parts) != 3:
+            return
+        iid = parts[1]
+        if iid == self.own_id:
+            return
+        if self.neighbours is not None and iid not in self.neighbours:
+            return
+
+        try:
+            msg = decode_phase(payload)
+        except (ValueError, struct.error):
+            self.errors += 1
+            return
+
+        now = time.time()
+        with self._lock:
+            prev = self._latest.get(iid)
+            if prev is not None and msg.ts < prev.ts:
+                return
+            self._latest[iid] = msg
+            self._recv_ts[iid] = now
+            self.received += 1
+
+        if self.on_update is not None:
+            self.on_update(iid, msg)
+
+    def phases(self, include_stale=False):
+        now = time.time()
+        with self._lock:
+            return {
+                iid: msg for iid, msg in self._latest.items()
+                if include_stale or (now - self._recv_ts[iid]) <= self.stale_sec
+            }
+
+
+# -----------------------------
+# Benchmark: python -m net.bus
+# -----------------------------
+def _bench(n_msgs=20000, n_intersections=8, n_approaches=4):
+    broker = LocalBroker()
+    lat = []
+
+    sub = NeighbourSubscriber(broker, own_id="bench")
+    sub.on_update = lambda iid, msg: lat.append(time.time() - msg.ts)
+
+    pubs = [TelemetryPublisher(broker, f"X{k}", flush_interval=0.0) for k in range(n_intersections)]
+    ph = {"state": "GREEN", "green_idx": 1, "yellow_idx": None, "remaining": 7.5,
+          "green_budget": 20.0, "tag": "NORMAL", "emergency_target": None}
+    counts = list(range(n_approaches))
+
+    size = len(encode_phase(counts, ph))
+    t0 = time.perf_counter()
+    for k in range(n_msgs):
+        pubs[k % n_intersections].publish_tick(counts, ph)
+    t_pub = time.perf_counter() - t0
+
+    for p in pubs:
+        p.stop()
+
+    lat.sort()
+    sent = sum(p.sent for p in pubs)
+    coalesced = sum(p.coalesced for p in pubs)
+    print(f"payload={size}B published={n_msgs} delivered={len(lat)} sent={sent} coalesced={coalesced}")
+    print(f"publish() cost: {t_pub / n_msgs * 1e6:.2f} us/msg")
+    if lat:
+        def pct(q):
+            return lat[min(len(lat) - 1, int(q * len(lat)))] * 1e3
+        print(f"end-to-end latency ms: p50={pct(0.50):.3f} p99={pct(0.99):.3f} max={lat[-1] * 1e3:.3f}")
+
+
+if __name__ == "__main__":
+    _bench()
@@ -0,0 +1,115 @@
+import threading
+import time
+
+
+STARTING = "STARTING"
+OK = "OK"
+STALE = "STALE"
+RECONNECTING = "RECONNECTING"
+DOWN = "DOWN"
+
+
+class CameraHealth:
+    """
+    Per camera state machine, driven from the watchdog thread:
+
+        STARTING      opened, first frame not in yet (rtsp handshake,
+                      first keyframe); forced reopen after dead_sec
+        OK            fresh frames (age <= stale_sec)
+        STALE         source connected but no frame for stale_sec
+        RECONNECTING  source closed / reopening (StreamSource backoff);
+                      also forced when STALE lasts dead_sec
+        DOWN          not back after down_sec -> keeps retrying in background
+
+    A source that reports connected but stays silent (hung driver: grab()
+    blocks again after every reopen) is restart()ed again and again, the
+    wait doubling from dead_sec up to retry_max, in any degraded state.
+
+    Anything but OK is "degraded": the controller holds the last known
+    demand for that approach instead of reading it as empty.
+    """
+
+    def __init__(self, name, source, stale_sec=2.0, dead_sec=5.0, down_sec=30.0, retry_max=60.0):
+        self.name = name
+        self.source = source
+        self.stale_sec = float(stale_sec)
+        self.dead_sec = float(dead_sec)
+        self.down_sec = float(down_sec)
+        self.retry_max = float(retry_max)
+        self._retry = self.dead_sec  # silence before the next forced restart
+
+        self.state = STARTING
+        self.since = time.time()
+        self.transitions = 0
+        self._opened = self.since   # last (re)open: silence is timed from here at most
+
+    @property
+    def degraded(self):
+        return self.state != OK
+
+    def _go(self, state, now):
+        if state == self.state:
+            return
+        print(f"[{time.strftime('%H:%M:%S')}] CAMERA {self.name}: {self.state} -> {state} "
+              f"(reconnects={self.source.reconnects}, restarts={self.source.restarts}, "
+              f"err={self.source.last_error!r})")
+        self.state = state
+        self.since = now
+        self.transitions += 1
+
+    def update(self, now=None):
+        now = time.time() if now is None else now
+        src = self.source
+        age = src.frame_age()
+        silent = min(age, now - self._opened)   # age is inf before the first frame
+
+        if src.connected and age <= self.stale_sec:
+            self._retry = self.dead_sec
+            self._go(OK, now)
+            return self.state
+
+        if src.connected:
+            if self.state == OK:
+                self._go(STALE, now)
+            elif silent > self._retry:
+                src.restart()
+                self._opened = now
+                self._retry = min(self.retry_max, self._retry * 2.0)
+                if self.state != DOWN:
+                    self._go(RECONNECTING, now)
+        elif self.state in (OK, STALE):
+            self._go(RECONNECTING, now)
+
+        if self.state in (STARTING, RECONNECTING) and (now - self.since) > self.down_sec:
+            self._go(DOWN, now)
+        return self.state
+
+
+class CameraWatchdog:
+    """
+    Background thread updating every CameraHealth every `period` seconds.
+    """
+
+    def __init__(self, healths, period=0.25):
+        self.healths = list(healths)
+        self.period = float(period)
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, daemon=True, name="camera-watchdog")
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop:
+            now = time.time()
+            for h in self.healths:
+                h.update(now)
+            time.sleep(self.period)
+
+    def degraded(self):
+        return [i for i, h in enumerate(self.healths) if h.degraded]
+
+    def states(self):
+        return [h.state for h in self.healths]
+
+    def stop(self):
+        self._stop = True
+        self._thread.join(timeout=1.0)
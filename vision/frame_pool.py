@@ -0,0 +1,52 @@
+import threading
+
+import numpy as np
+
+
+class FramePool:
+    """
+    Fixed shape frame buffers, recycled instead of reallocated every loop.
+    - acquire() hands out a free buffer (allocates only when none is free)
+    - release(buf) gives it back; wrong shape / pool full -> dropped
+    - allocs counts real allocations; take_allocs() returns the number since
+      the previous call (per iteration reporting)
+    """
+
+    def __init__(self, shape, dtype=np.uint8, capacity=4):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.capacity = int(capacity)
+
+        self._free = []
+        self._lock = threading.Lock()
+
+        self.allocs = 0
+        self.acquires = 0
+        self.releases = 0
+        self._allocs_seen = 0
+
+    def acquire(self):
+        with self._lock:
+            self.acquires += 1
+            if self._free:
+                return self._free.pop()
+            self.allocs += 1
+        return np.empty(self.shape, dtype=self.dtype)
+
+    def release(self, buf):
+        if buf is None or buf.shape != self.shape or buf.dtype != self.dtype:
+            return
+        with self._lock:
+            self.releases += 1
+            if len(self._free) < self.capacity:
+                self._free.append(buf)
+
+    def take_allocs(self):
+        with self._lock:
+            n = self.allocs - self._allocs_seen
+            self._allocs_seen = self.allocs
+        return n
+
+    @property
+    def in_use(self):
+        return self.acquires - self.releases
@@ -0,0 +1,178 @@
+import json
+import time
+
+
+# (imgsz for priority approaches, imgsz for the others, detect others every
+#  `stride` loops, capture size index) -- from full quality to max shedding
+DEFAULT_RUNGS = [
+    (640, 640, 1, 0),
+    (640, 480, 1, 0),
+    (640, 480, 2, 0),
+    (640, 320, 3, 0),
+    (480, 320, 4, 0),
+    (480, 320, 4, 1),
+    (320, 320, 6, 2),
+]
+
+DEFAULT_CAPTURE_SIZES = [(1280, 720), (960, 540), (640, 360)]
+
+
+class LoadGovernor:
+    """
+    Keeps the main loop inside a latency budget by shedding detection work.
+
+    - observe(loop_ms) feeds an EWMA of the loop latency
+    - above target * high for `patience` loops -> one rung down the ladder
+    - below target * low for 3 * `patience` loops -> one rung up
+    - plan() returns per approach imgsz (or None = skip this loop): the
+      green approach and the policy's next_candidate() always run, the others only
+      every `stride` loops, staggered so they don't all land together
+    - every rung change is appended to `log_path` (JSON lines) so a drop in
+      count accuracy can be matched with the resolution that produced it
+    """
+
+    def __init__(
+        self,
+        n,
+        target_ms=150.0,
+        rungs=None,
+        capture_sizes=None,
+        high=1.10,
+        low=0.70,
+        alpha=0.2,
+        patience=5,
+        log_path=None,
+    ):
+        self.n = int(n)
+        self.target_ms = float(target_ms)
+        self.rungs = list(rungs or DEFAULT_RUNGS)
+        self.capture_sizes = list(capture_sizes or DEFAULT_CAPTURE_SIZES)
+        self.high = float(high)
+        self.low = float(low)
+        self.alpha = float(alpha)
+        self.patience = int(patience)
+        self.log_path = log_path
+
+        self.rung = 0
+        self.ewma_ms = 0.0
+        self._over = 0
+        self._under = 0
+        self._iter = 0
+
+        self.skipped = [0] * self.n
+        self.ran = [0] * self.n
+        self.last_imgsz = [None] * self.n
+
+    # ---------- state ----------
+    @property
+    def capture_size(self):
+        return self.capture_sizes[min(self.rungs[self.rung][3], len(self.capture_sizes) - 1)]
+
+    def describe(self):
+        prio, other, stride, _ = self.rungs[self.rung]
+        w, h = self.capture_size
+        return f"rung={self.rung} imgsz={prio}/{other} stride={stride} cap={w}x{h} ewma={self.ewma_ms:.0f}ms"
+
+    # ---------- decisions ----------
+    def observe(self, loop_ms):
+        """
+        Returns True if the rung changed (capture size may need re-applying).
+        """
+        loop_ms = float(loop_ms)
+        if self.ewma_ms <= 0.0:
+            self.ewma_ms = loop_ms
+        else:
+            self.ewma_ms = self.alpha * loop_ms + (1.0 - self.alpha) * self.ewma_ms
+
+        if self.ewma_ms > self.target_ms * self.high:
+            self._over += 1
+            self._under = 0
+        elif self.ewma_ms < self.target_ms * self.low:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.patience and self.rung < len(self.rungs) - 1:
+            return self._move(self.rung + 1, "over_budget")
+        if self._under >= 3 * self.patience and self.rung > 0:
+            return self._move(self.rung - 1, "under_budget")
+        return False
+
+    def _move(self, rung, reason):
+        old = self.rung
+        old_cap = self.capture_size
+        self.rung = rung
+        self._over = self._under = 0
+
+        prio, other, stride, _ = self.rungs[rung]
+        rec = {
+            "ts": time.time(),
+            "event": "rung",
+            "reason": reason,
+            "from": old,
+            "to": rung,
+            "ewma_ms": round(self.ewma_ms, 1),
+            "target_ms": self.target_ms,
+            "imgsz_priority": prio,
+            "imgsz_other": other,
+            "stride": stride,
+            "capture": list(self.capture_size),
+            "capture_changed": self.capture_size != old_cap,
+            "skipped": list(self.skipped),
+        }
+        self._log(rec)
+        print(f"[{time.strftime('%H:%M:%S')}] GOVERNOR {reason}: {self.describe()}")
+
+        # re-seed so the next move is judged on latency at the new rung
+        self.ewma_ms = 0.0
+        return True
+
+    def _log(self, rec):
+        if not self.log_path:
+            return
+        try:
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(rec) + "\n")
+        except OSError:
+            pass
+
+    def plan(self, priority):
+        """
+        priority: approach indexes that must be sampled this loop
+        Returns [imgsz or None] per approach.
+        """
+        prio, other, stride, _ = self.rungs[self.rung]
+        pset = {int(p) for p in priority if p is not None}
+        it = self._iter
+        self._iter += 1
+
+        out = []
+        for i in range(self.n):
+            if i in pset:
+                sz = prio
+            elif (it + i) % stride == 0:
+                sz = other
+            else:
+                sz = None
+
+            if sz is None:
+                self.skipped[i] += 1
+            else:
+                self.ran[i] += 1
+            self.last_imgsz[i] = sz
+            out.append(sz)
+        return out
+
+
+def scale_roi(roi, frame_shape, ref_w, ref_h):
+    """
+    ROIs are configured at (ref_w, ref_h); rescale them to the current frame.
+    """
+    h, w = frame_shape[:2]
+    if w == ref_w and h == ref_h:
+        return roi
+    sx = w / float(ref_w)
+    sy = h / float(ref_h)
+    x1, y1, x2, y2 = roi
+    return (int(x1 * sx), int(y1 * sy), int(x2 * sx), int(y2 * sy))
@@ -0,0 +1,504 @@
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+import cv2
+
+from vision.frame_pool import FramePool
+
+
+def is_stream_url(src):
+    return isinstance(src, str) and "://" in src
+
+
+_FFMPEG_MAJOR = {}
+
+
+def ffmpeg_major(ffmpeg="ffmpeg"):
+    """
+    Major version from `ffmpeg -version` (cached per executable).
+    Git / unknown builds count as new (99).
+    """
+    if ffmpeg not in _FFMPEG_MAJOR:
+        major = 99
+        try:
+            out = subprocess.run([ffmpeg, "-version"], capture_output=True, text=True, timeout=5.0).stdout
+            m = re.match(r"\S+ version n?(\d+)\.", out)
+            if m:
+                major = int(m.group(1))
+        except (OSError, subprocess.SubprocessError):
+            pass
+        _FFMPEG_MAJOR[ffmpeg] = major
+    return _FFMPEG_MAJOR[ffmpeg]
+
+
+def fit_into(frame, buf):
+    """
+    Decoder did not write into `buf` (other size / layout): copy or resize into it.
+    """
+    if frame.shape == buf.shape:
+        buf[...] = frame
+    else:
+        cv2.resize(frame, (buf.shape[1], buf.shape[0]), dst=buf, interpolation=cv2.INTER_AREA)
+
+
+class StreamSource:
+    """
+    Network / file video source with a cv2.VideoCapture-like surface
+    (read / grab / set / isOpened / release), decoded in the background.
+
+    - a reader thread owns the decoder and keeps only the latest frame,
+      so read() never blocks on the network
+    - frames are dropped at the source: decode at `fps` and (width, height)
+    - on EOF / error the thread reconnects with exponential backoff
+      (backoff_min .. backoff_max), the main loop just sees ok=False
+    - network reads give up after `timeout` s of silence, so a stalled
+      stream ends up in that reconnect path instead of blocking forever
+    - restart() also works on a reader stuck inside the decoder (hung
+      driver): see restart()
+    - frames are decoded into buffers from a FramePool; read() hands over
+      the newest unread frame (if younger than stale_sec) and the caller
+      gives it back with release_frame() once drawn / shown
+    """
+
+    backend = "base"
+
+    def __init__(self, src, width=1280, height=720, fps=5.0, stale_sec=2.0,
+                 backoff_min=0.5, backoff_max=30.0, loop=False, timeout=10.0):
+        self.src = src
+        self.timeout = float(timeout)
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = float(fps)
+        self.stale_sec = float(stale_sec)
+        self.backoff_min = float(backoff_min)
+        self.backoff_max = float(backoff_max)
+        self.loop = bool(loop)
+
+        self.pool = FramePool((self.height, self.width, 3))
+
+        self._lock = threading.Lock()
+        self._frame = None
+        self._frame_ts = 0.0
+        self._stop = False
+        self._restart = False
+        self._gen = 0          # reader generation, bumped by restart()
+        self._handle = None    # decoder of the current reader
+
+        self.connected = False
+        self.reconnects = 0
+        self.restarts = 0
+        self.frames = 0
+        self.last_error = ""
+
+        self._spawn()
+
+    # ---------- backend hooks ----------
+    # A handle (ffmpeg process, VideoCapture, ...) belongs to the reader
+    # thread that opened it, so an abandoned reader never touches the
+    # decoder of the one that replaced it.
+    def _open(self):
+        """
+        Open the source, return the handle passed to the other hooks.
+        """
+        raise NotImplementedError
+
+    def _grab_into(self, h, buf):
+        """
+        Block until the next frame and decode it into `buf`.
+        Return False on EOF / error.
+        """
+        raise NotImplementedError
+
+    def _close(self, h):
+        pass
+
+    def _interrupt(self, h):
+        """
+        Called from another thread: unblock a reader stuck in _grab_into.
+        Return False if the backend cannot do that safely.
+        """
+        return False
+
+    # ---------- reader thread ----------
+    def _spawn(self):
+        self._thread = threading.Thread(target=self._run, args=(self._gen,), daemon=True,
+                                        name=f"stream:{self.backend}:{self._gen}")
+        self._thread.start()
+
+    def _current(self, gen):
+        return not self._stop and gen == self._gen
+
+    def _run(self, gen):
+        delay = self.backoff_min
+        while self._current(gen):
+            h = None
+            try:
+                if self.pool.shape != (self.height, self.width, 3):
+                    self.pool = FramePool((self.height, self.width, 3))
+                h = self._open()
+                with self._lock:
+                    if gen != self._gen:
+                        continue  # retired while opening, `finally` closes h
+                    self._handle = h
+                    self.connected = True
+                self._restart = False
+                got_any = False
+
+                while self._current(gen) and not self._restart:
+                    pool = self.pool
+                    buf = pool.acquire()
+                    if not self._grab_into(h, buf) or gen != self._gen:
+                        pool.release(buf)
+                        break
+                    if not got_any:
+                        got_any = True
+                        self.last_error = ""
+                    with self._lock:
+                        old = self._frame
+                        self._frame = buf
+                        self._frame_ts = time.time()
+                    if old is not None:
+                        pool.release(old)  # never read, recycle
+                    self.frames += 1
+
+                if got_any:
+                    delay = self.backoff_min
+                if not self._restart and self._current(gen):
+                    self.last_error = self.last_error or "Stream ended."
+            except Exception as e:
+                if gen == self._gen:
+                    self.last_error = f"Stream error: {type(e).__name__}: {e}"
+            finally:
+                with self._lock:
+                    if gen == self._gen:
+                        self.connected = False
+                        self._handle = None
+                if h is not None:
+                    try:
+                        self._close(h)
+                    except Exception:
+                        pass
+
+            if not self._current(gen):
+                break
+            if self._restart:
+                continue
+
+            self.reconnects += 1
+            t_end = time.time() + delay
+            while self._current(gen) and time.time() < t_end:
+                time.sleep(0.05)
+            delay = min(self.backoff_max, delay * 2.0)
+
+    def frame_age(self):
+        with self._lock:
+            ts = self._frame_ts
+        return float("inf") if ts <= 0.0 else time.time() - ts
+
+    def restart(self):
+        """
+        Close and reopen the source, even if the reader is blocked inside
+        the decoder. The current reader is retired and a fresh one opens
+        the source; the backend unblocks the old one if it can (ffmpeg:
+        process killed). A blocked OpenCV capture is not released from
+        here (not safe while another thread is inside grab()): its reader
+        closes it and exits as soon as the call returns.
+        """
+        with self._lock:
+            self._gen += 1
+            h = self._handle
+            self._handle = None
+            self.connected = False
+        if h is not None:
+            try:
+                self._interrupt(h)
+            except Exception:
+                pass
+        self.restarts += 1
+        if not self._stop:
+            self._spawn()
+
+    # ---------- VideoCapture-like API ----------
+    def read(self):
+        """
+        (True, frame) with the newest unread frame, else (False, None).
+        The frame belongs to the caller until release_frame(frame).
+        """
+        with self._lock:
+            frame, ts = self._frame, self._frame_ts
+            self._frame = None
+        if frame is None:
+            return False, None
+        if (time.time() - ts) > self.stale_sec:
+            self.pool.release(frame)
+            return False, None
+        return True, frame
+
+    def release_frame(self, frame):
+        self.pool.release(frame)
+
+    def grab(self):
+        # decoding already runs at the target rate in the background
+        return self.connected
+
+    def isOpened(self):
+        return not self._stop
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            self.width = int(value)
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            self.height = int(value)
+        elif prop == cv2.CAP_PROP_FPS:
+            self.fps = float(value)
+        else:
+            return False
+        self._restart = True
+        return True
+
+    def release(self):
+        self._stop = True
+        with self._lock:
+            h = self._handle
+        if h is not None:
+            try:
+                self._interrupt(h)
+            except Exception:
+                pass
+        self._thread.join(timeout=2.0)
+
+
+class FFmpegSource(StreamSource):
+    """
+    ffmpeg subprocess -> raw BGR frames on a pipe.
+    fps / scale filters run inside ffmpeg, so Python only ever sees the
+    frames it will use, at the size it needs.
+    Socket timeout: rtsp uses -timeout on ffmpeg >= 5 and -stimeout on 4.x
+    (where -timeout means listen mode); other URLs use -rw_timeout.
+    """
+
+    backend = "ffmpeg"
+
+    def __init__(self, src, *args, ffmpeg="ffmpeg", hwaccel=None, **kw):
+        self.ffmpeg = ffmpeg
+        self.hwaccel = hwaccel
+        super().__init__(src, *args, **kw)
+
+    def _cmd(self):
+        cmd = [self.ffmpeg, "-hide_banner", "-loglevel", "error", "-nostdin"]
+        if self.hwaccel:
+            cmd += ["-hwaccel", self.hwaccel]
+        if is_stream_url(self.src):
+            us = str(int(self.timeout * 1e6))
+            if str(self.src).startswith("rtsp://"):
+                opt = "-timeout" if ffmpeg_major(self.ffmpeg) >= 5 else "-stimeout"
+                cmd += ["-rtsp_transport", "tcp", opt, us]
+            else:
+                cmd += ["-rw_timeout", us]
+            cmd += ["-fflags", "nobuffer", "-flags", "low_delay"]
+        else:
+            cmd += ["-re"]
+            if self.loop:
+                cmd += ["-stream_loop", "-1"]
+        cmd += [
+            "-i", str(self.src),
+            "-an",
+            "-vf", f"fps={self.fps},scale={self.width}:{self.height}",
+            "-pix_fmt", "bgr24",
+            "-f", "rawvideo",
+            "pipe:1",
+        ]
+        return cmd
+
+    def _open(self):
+        if shutil.which(self.ffmpeg) is None and not os.path.exists(self.ffmpeg):
+            raise RuntimeError(f"{self.ffmpeg} not found")
+        return subprocess.Popen(
+            self._cmd(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=self.width * self.height * 3,
+        )
+
+    def _grab_into(self, proc, buf):
+        view = memoryview(buf).cast("B")
+        got = 0
+        while got < len(view):
+            n = proc.stdout.readinto(view[got:])
+            if not n:
+                return False
+            got += n
+        return True
+
+    def _close(self, proc):
+        proc.kill()
+        proc.wait(timeout=2.0)
+
+    def _interrupt(self, proc):
+        proc.kill()  # readinto() returns EOF
+        return True
+
+
+class GStreamerSource(StreamSource):
+    """
+    OpenCV built with GStreamer: uridecodebin + videorate/videoscale in the
+    pipeline, appsink keeps a single buffer and drops the rest.
+    """
+
+    backend = "gstreamer"
+
+    def _pipeline(self):
+        uri = self.src if is_stream_url(self.src) else Path(self.src).resolve().as_uri()
+        fps = max(1, int(round(self.fps)))
+        return (
+            f"uridecodebin uri={uri} ! "
+            f"videorate drop-only=true ! video/x-raw,framerate={fps}/1 ! "
+            f"videoscale ! videoconvert ! "
+            f"video/x-raw,format=BGR,width={self.width},height={self.height} ! "
+            f"appsink drop=true max-buffers=1 sync={'false' if is_stream_url(self.src) else 'true'}"
+        )
+
+    def _open(self):
+        cap = cv2.VideoCapture(self._pipeline(), cv2.CAP_GSTREAMER)
+        if not cap.isOpened():
+            raise RuntimeError("GStreamer pipeline failed to open")
+        return cap
+
+    def _grab_into(self, cap, buf):
+        ok, frame = cap.read(image=buf)
+        if ok and frame is not buf:
+            fit_into(frame, buf)
+        return ok
+
+    def _close(self, cap):
+        cap.release()
+
+
+class _Capture:
+    """
+    OpenCVSource handle: the capture plus its pacing state.
+    """
+
+    def __init__(self, cap, file, src_dt, gen):
+        self.cap = cap
+        self.file = file
+        self.src_dt = src_dt
+        self.gen = gen
+        self.next_due = 0.0
+
+
+class OpenCVSource(StreamSource):
+    """
+    Fallback: default OpenCV backend. Decodes every frame, but only frames
+    due at `fps` are retrieved (colour converted) and resized.
+    """
+
+    backend = "opencv"
+
+    def _open(self):
+        if is_stream_url(self.src) and hasattr(cv2, "CAP_PROP_READ_TIMEOUT_MSEC"):  # OpenCV >= 4.6
+            ms = int(self.timeout * 1e3)
+            cap = cv2.VideoCapture(self.src, cv2.CAP_ANY, [
+                cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, ms, cv2.CAP_PROP_READ_TIMEOUT_MSEC, ms])
+        else:
+            cap = cv2.VideoCapture(self.src)
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open {self.src}")
+        file = not is_stream_url(self.src)
+        src_fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        src_dt = 1.0 / src_fps if (file and src_fps > 0) else 0.0
+        return _Capture(cap, file, src_dt, self._gen)
+
+    def _grab_into(self, h, buf):
+        period = 1.0 / self.fps if self.fps > 0 else 0.0
+        while self._current(h.gen):
+            if not h.cap.grab():
+                if h.file and self.loop:
+                    h.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                return False
+            if h.src_dt:
+                time.sleep(h.src_dt)  # pace files like a live camera
+            now = time.time()
+            if now < h.next_due:
+                continue
+            h.next_due = now + period
+            ok, frame = h.cap.retrieve(image=buf)
+            if not ok:
+                return False
+            if frame is not buf:
+                fit_into(frame, buf)
+            return True
+        return False
+
+    def _close(self, h):
+        h.cap.release()
+
+
+class DeviceSource(OpenCVSource):
+    """
+    Local OpenCV camera (index) read in the background, so a dead or
+    hanging device driver never blocks the main loop.
+    """
+
+    backend = "device"
+
+    def _open(self):
+        cap = cv2.VideoCapture(int(self.src))
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open camera {self.src}")
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        return _Capture(cap, False, 0.0, self._gen)
+
+
+BACKENDS = {
+    "ffmpeg": FFmpegSource,
+    "gstreamer": GStreamerSource,
+    "opencv": OpenCVSource,
+}
+
+
+def open_source(src, backend="ffmpeg", **kw):
+    """
+    src: rtsp:// / http:// URL or a video file path.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown stream backend: {backend}")
+    return BACKENDS[backend](src, **kw)
+
+
+# -----------------------------
+# Smoke / benchmark: python -m vision.stream_source <url|file> [backend] [seconds]
+# -----------------------------
+def _bench(src, backend="ffmpeg", seconds=10.0):
+    s = open_source(src, backend=backend, loop=True)
+    t0 = time.time()
+    reads = ok_reads = 0
+    while time.time() - t0 < seconds:
+        ok, frame = s.read()
+        reads += 1
+        if ok:
+            ok_reads += 1
+            s.release_frame(frame)
+        time.sleep(0.005)
+    s.release()
+    dt = time.time() - t0
+    print(f"{backend}: decoded={s.frames} ({s.frames / dt:.1f} fps) "
+          f"ok_reads={ok_reads}/{reads} buffer_allocs={s.pool.allocs} "
+          f"reconnects={s.reconnects} last_error={s.last_error!r}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    a = sys.argv[1:]
+    if not a:
+        print("usage: python -m vision.stream_source <url|file> [ffmpeg|gstreamer|opencv] [seconds]")
+        sys.exit(1)
+    _bench(a[0], a[1] if len(a) > 1 else "ffmpeg", float(a[2]) if len(a) > 2 else 10.0)
@@ -1,4 +1,7 @@
+import time
+
 import cv2
+import numpy as np
 from ultralytics import YOLO
 
 VEHICLE_LABELS = {
@@ -7,12 +10,107 @@ VEHICLE_LABELS = {
     "handcart", "vehicle"
 }
 
+
+def tile_origins(length, tile, overlap):
+    """
+    Start offsets covering [0, length) with tiles of `tile` px and
+    `overlap` fraction overlap; last tile is pulled back to end at `length`.
+    """
+    if length <= tile:
+        return [0]
+    step = max(1, int(tile * (1.0 - overlap)))
+    xs = list(range(0, length - tile, step))
+    xs.append(length - tile)
+    return xs
+
+
+def merge_nms(boxes, scores, classes, iou=0.5, ios=0.7, tile_ids=None, cut=None):
+    """
+    Class-wise NMS over boxes coming from several tiles.
+    A box is dropped if it overlaps a kept box of the same class by
+    IoU > iou, or by intersection / smaller area > ios (catches the
+    truncated half of an object cut by a tile border).
+
+    The IoS rule only applies across tiles (tile_ids differ) and, if `cut`
+    is given, only when one of the two boxes touches an inner tile seam:
+    two occluded two-wheelers inside one tile are both kept.
+    tile_ids=None -> IoU only.
+    Returns kept indexes (highest score first).
+    """
+    if len(boxes) == 0:
+        return np.zeros((0,), dtype=np.int64)
+
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    area = np.maximum(0.0, x2 - x1) * np.maximum(0.0, y2 - y1)
+    order = np.argsort(-scores)
+    keep = []
+
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        if rest.size == 0:
+            break
+
+        ix1 = np.maximum(x1[i], x1[rest])
+        iy1 = np.maximum(y1[i], y1[rest])
+        ix2 = np.minimum(x2[i], x2[rest])
+        iy2 = np.minimum(y2[i], y2[rest])
+        inter = np.maximum(0.0, ix2 - ix1) * np.maximum(0.0, iy2 - iy1)
+
+        union = area[i] + area[rest] - inter
+        o_iou = inter / np.maximum(union, 1e-6)
+        o_ios = inter / np.maximum(np.minimum(area[i], area[rest]), 1e-6)
+
+        same = classes[rest] == classes[i]
+        if tile_ids is None:
+            seam = np.zeros(rest.shape, dtype=bool)
+        else:
+            seam = tile_ids[rest] != tile_ids[i]
+            if cut is not None:
+                seam &= cut[i] | cut[rest]
+        drop = same & ((o_iou > iou) | (seam & (o_ios > ios)))
+        order = rest[~drop]
+
+    return np.array(keep, dtype=np.int64)
+
+
+class TileGate:
+    """
+    Per approach hysteresis for tiled mode:
+    - off -> on after `hold` frames with coarse count >= on_count
+    - on -> off after `hold` frames with tiled count < off_count
+    """
+
+    def __init__(self, on_count=12, off_count=8, hold=3):
+        self.on_count = int(on_count)
+        self.off_count = int(off_count)
+        self.hold = int(hold)
+        self.active = False
+        self._streak = 0
+
+    def update(self, count):
+        flip = (count < self.off_count) if self.active else (count >= self.on_count)
+        self._streak = self._streak + 1 if flip else 0
+        if self._streak >= self.hold:
+            self.active = not self.active
+            self._streak = 0
+        return self.active
+
+
 class YOLOWorldDetector:
-    def __init__(self, weights, prompts, conf, iou):
+    SEAM_MARGIN = 4  # px from a tile border that counts as "cut by the seam"
+
+    def __init__(self, weights, prompts, conf, iou, tile=640, tile_overlap=0.2):
         self.model = YOLO(weights)
         self.model.set_classes(prompts)
         self.conf = conf
         self.iou = iou
+        self.tile = int(tile)
+        self.tile_overlap = float(tile_overlap)
+
+        # max confidence per label of the last detect_* call (emergency fusion)
+        self.last_label_conf = {}
 
     @staticmethod
     def crop_roi(frame, roi):
@@ -21,34 +119,184 @@ class YOLOWorldDetector:
         x2 = min(frame.shape[1], int(x2)); y2 = min(frame.shape[0], int(y2))
         return frame[y1:y2, x1:x2], (x1, y1, x2, y2)
 
-    def detect_and_plot(self, frame, roi):
+    @staticmethod
+    def _count(labels):
+        vehicle_count = 0
+        label_hist = {}
+        for label in labels:
+            label_hist[label] = label_hist.get(label, 0) + 1
+            if label in VEHICLE_LABELS and label != "person":
+                vehicle_count += 1
+        return vehicle_count, label_hist
+
+    @staticmethod
+    def _label_conf(labels, confs):
+        best = {}
+        for label, c in zip(labels, confs):
+            c = float(c)
+            if c > best.get(label, 0.0):
+                best[label] = c
+        return best
+
+    @staticmethod
+    def _draw(img, boxes, labels, confs):
+        for (bx1, by1, bx2, by2), label, c in zip(boxes.astype(int), labels, confs):
+            cv2.rectangle(img, (bx1, by1), (bx2, by2), (255, 128, 0), 2)
+            cv2.putText(img, f"{label} {c:.2f}", (bx1, max(12, by1 - 4)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 128, 0), 1)
+
+    def detect_and_plot(self, frame, roi, imgsz=640, tiled=False, inplace=False):
+        """
+        inplace=True: boxes are drawn straight into `frame` (a pooled buffer
+        owned by the caller) instead of res.plot() + frame.copy().
+        """
+        if tiled:
+            return self.detect_tiled(frame, roi, inplace=inplace)
+
         roi_img, (x1, y1, x2, y2) = self.crop_roi(frame, roi)
+        self.last_label_conf = {}
 
         if roi_img.size == 0:
             return frame, 0, {}
 
         res = self.model.predict(
             roi_img,
-            imgsz=640,
+            imgsz=int(imgsz),
             conf=self.conf,
             iou=self.iou,
             verbose=False
         )[0]
 
-        roi_plot = res.plot()
-        out = frame.copy()
-        out[y1:y2, x1:x2] = roi_plot
+        if inplace:
+            out = frame
+        else:
+            roi_plot = res.plot()
+            out = frame.copy()
+            out[y1:y2, x1:x2] = roi_plot
 
         vehicle_count = 0
         label_hist = {}
 
         if res.boxes is not None and len(res.boxes) > 0:
             names = res.names
-            for b in res.boxes:
-                cls_id = int(b.cls)
-                label = names.get(cls_id, str(cls_id)).lower().strip()
-                label_hist[label] = label_hist.get(label, 0) + 1
-                if label in VEHICLE_LABELS and label != "person":
-                    vehicle_count += 1
+            labels = [names.get(int(b.cls), str(int(b.cls))).lower().strip() for b in res.boxes]
+            confs = res.boxes.conf.cpu().numpy()
+            vehicle_count, label_hist = self._count(labels)
+            self.last_label_conf = self._label_conf(labels, confs)
+            if inplace:
+                self._draw(roi_img, res.boxes.xyxy.cpu().numpy(), labels, confs)
 
         return out, vehicle_count, label_hist
+
+    def detect_tiled(self, frame, roi, inplace=False):
+        """
+        Full resolution ROI split into overlapping tile x tile crops, run as
+        one batch, boxes merged with cross-tile NMS.
+        """
+        roi_img, (x1, y1, x2, y2) = self.crop_roi(frame, roi)
+        self.last_label_conf = {}
+
+        if roi_img.size == 0:
+            return frame, 0, {}
+
+        h, w = roi_img.shape[:2]
+        origins = [(tx, ty)
+                   for ty in tile_origins(h, self.tile, self.tile_overlap)
+                   for tx in tile_origins(w, self.tile, self.tile_overlap)]
+        tiles = [roi_img[ty:ty + self.tile, tx:tx + self.tile] for tx, ty in origins]
+
+        results = self.model.predict(
+            tiles,
+            imgsz=self.tile,
+            conf=self.conf,
+            iou=self.iou,
+            verbose=False
+        )
+
+        all_boxes, all_scores, all_cls, all_tile, all_cut = [], [], [], [], []
+        names = {}
+        m = self.SEAM_MARGIN
+        for t, ((tx, ty), res) in enumerate(zip(origins, results)):
+            names = res.names
+            if res.boxes is None or len(res.boxes) == 0:
+                continue
+            b = res.boxes.xyxy.cpu().numpy().astype(np.float32)
+
+            # box clipped by a tile border that is not the ROI border
+            th, tw = tiles[t].shape[:2]
+            cut = ((tx > 0) & (b[:, 0] <= m)) | ((tx + tw < w) & (b[:, 2] >= tw - m)) \
+                | ((ty > 0) & (b[:, 1] <= m)) | ((ty + th < h) & (b[:, 3] >= th - m))
+
+            b[:, [0, 2]] += tx
+            b[:, [1, 3]] += ty
+            all_boxes.append(b)
+            all_scores.append(res.boxes.conf.cpu().numpy())
+            all_cls.append(res.boxes.cls.cpu().numpy().astype(np.int64))
+            all_tile.append(np.full(len(b), t, dtype=np.int64))
+            all_cut.append(cut)
+
+        out = frame if inplace else frame.copy()
+        if not all_boxes:
+            return out, 0, {}
+
+        boxes = np.concatenate(all_boxes)
+        scores = np.concatenate(all_scores)
+        classes = np.concatenate(all_cls)
+        keep = merge_nms(boxes, scores, classes, iou=self.iou,
+                         tile_ids=np.concatenate(all_tile), cut=np.concatenate(all_cut))
+
+        boxes, scores, classes = boxes[keep], scores[keep], classes[keep]
+        labels = [names.get(int(c), str(int(c))).lower().strip() for c in classes]
+
+        self._draw(out[y1:y2, x1:x2], boxes, labels, scores)
+        vehicle_count, label_hist = self._count(labels)
+        self.last_label_conf = self._label_conf(labels, scores)
+        return out, vehicle_count, label_hist
+
+
+# -----------------------------
+# Benchmark: python -m vision.yolo_world_detector clip.mp4 [clip2.mp4 ...]
+# -----------------------------
+def _bench(paths, max_frames=300):
+    import config as C
+
+    det = YOLOWorldDetector(C.YOLO_WORLD_WEIGHTS, C.PROMPTS, C.CONF, C.IOU)
+
+    for path in paths:
+        cap = cv2.VideoCapture(path)
+        t_coarse, t_tiled, c_coarse, c_tiled = [], [], [], []
+
+        while len(t_coarse) < max_frames:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            roi = (0, 0, frame.shape[1], frame.shape[0])
+
+            t0 = time.perf_counter()
+            _, n0, _ = det.detect_and_plot(frame, roi)
+            t1 = time.perf_counter()
+            _, n1, _ = det.detect_tiled(frame, roi)
+            t2 = time.perf_counter()
+
+            t_coarse.append((t1 - t0) * 1e3)
+            t_tiled.append((t2 - t1) * 1e3)
+            c_coarse.append(n0)
+            c_tiled.append(n1)
+        cap.release()
+
+        if not t_coarse:
+            print(f"{path}: no frames")
+            continue
+
+        k = len(t_coarse)
+        mc, mt = sum(c_coarse) / k, sum(c_tiled) / k
+        print(f"{path}: frames={k} "
+              f"coarse {sum(t_coarse) / k:.1f}ms count={mc:.1f} | "
+              f"tiled {sum(t_tiled) / k:.1f}ms count={mt:.1f} | "
+              f"count gain={mt - mc:+.1f} ({(mt / mc - 1) * 100 if mc else 0:+.0f}%)")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _bench(sys.argv[1:])